@@ -1,50 +1,156 @@
+"""物品图标表
+
+资源文件由 assets/gen.py 生成。图标表在首次使用时读取，之后由定时任务检查文件的修改时间，
+有变化时在线程中读取新文件，生成新的 AssetsTables 后整体替换，查找时不需要加锁。
+同一次查找应使用同一个 AssetsTables，保证图标和 hash 来自同一版本。
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Iterable, Optional
+
 import ujson
 
-from assets.gen import ASSETS_GS_PATH, ASSETS_MC_PATH
+from assets.gen import (
+    ASSETS_GS_PATH,
+    ASSETS_HSR_PATH,
+    ASSETS_MC_PATH,
+    ASSETS_ZZZ_PATH,
+    load_json_file,
+)
+from fast_app.functions.icons import get_proxy_url
 from web_app.enums import Game
+from web_app.games.search import name_search_indexes
 
+logger = logging.getLogger(__name__)
 
 DEFAULT_ICON = "favicon.png"
 
+ASSETS_FILES: dict[Game, Path] = {
+    Game.GENSHIN: ASSETS_GS_PATH,
+    Game.MC: ASSETS_MC_PATH,
+    # 星铁和绝区零的资源文件不存在时按 id 拼接地址
+    Game.STARRAIL: ASSETS_HSR_PATH,
+    Game.ZZZ: ASSETS_ZZZ_PATH,
+}
+REQUIRED_ASSETS_FILES = (ASSETS_GS_PATH, ASSETS_MC_PATH)
 
-class Assets:
-    def __init__(self):
-        self.genshin_assets = {}
-        self.mc_assets = {}
-        self.load()
 
-    def load(self):
-        with open(ASSETS_GS_PATH, "r", encoding="utf-8") as f:
-            self.genshin_assets = ujson.load(f)
-        with open(ASSETS_MC_PATH, "r", encoding="utf-8") as f:
-            self.mc_assets = ujson.load(f)
+def get_assets_version() -> tuple:
+    """资源文件的 (inode, 修改时间)，文件被替换或修改后改变"""
+    version = []
+    for path in ASSETS_FILES.values():
+        try:
+            stat = os.stat(path)
+            version.append((stat.st_ino, stat.st_mtime_ns))
+        except FileNotFoundError:
+            version.append(None)
+    return tuple(version)
+
+
+class AssetsTables:
+    """某一版本的图标表，创建后不再修改"""
+
+    def __init__(self, tables: dict[Game, dict[str, str]], version: tuple = ()):
+        self.tables = tables
+        self.version = version
+        self.hash = "".join(tables.get(game, {}).get("hash", "") for game in ASSETS_FILES)
+
+    @classmethod
+    def load(cls) -> "AssetsTables":
+        """读取资源文件，必需的文件不存在或内容不完整时抛出异常"""
+        version = get_assets_version()
+        tables = {}
+        for game, path in ASSETS_FILES.items():
+            if path in REQUIRED_ASSETS_FILES:
+                with open(path, "r", encoding="utf-8") as f:
+                    tables[game] = ujson.load(f)
+            else:
+                tables[game] = load_json_file(path)
+        # 物品名称（非 id）同时收录到名称搜索索引
+        for game, table in tables.items():
+            name_search_indexes[game].add(i for i in table if i != "hash" and not i.isdigit())
+        return cls(tables, version)
 
     def get_gacha_icon_genshin(self, item_id: str) -> str:
-        return self.genshin_assets.get(item_id, DEFAULT_ICON)
+        return self.tables[Game.GENSHIN].get(item_id, DEFAULT_ICON)
 
     def get_gacha_icon_mc(self, item_id: str) -> str:
-        return self.mc_assets.get(item_id, DEFAULT_ICON)
+        return self.tables[Game.MC].get(item_id, DEFAULT_ICON)
 
-    @staticmethod
-    def get_gacha_icon_starrail(item_id: str) -> str:
+    def get_gacha_icon_starrail(self, item_id: str) -> str:
+        table = self.tables[Game.STARRAIL]
+        if item_id in table:
+            return table[item_id]
         if len(str(item_id)) == 5:  # light cone
             return f"https://stardb.gg/api/static/StarRailResWebp/icon/light_cone/{item_id}.webp"
         # character
         return f"https://stardb.gg/api/static/StarRailResWebp/icon/character/{item_id}.webp"
 
+    def get_gacha_icon_zzz(self, item_id: str) -> str:
+        return self.tables[Game.ZZZ].get(item_id) or f"https://stardb.gg/api/static/zzz/{item_id}.png"
+
     def get_gacha_icon(self, game: Game, item_id: str) -> str:
         if game is Game.GENSHIN:
             return self.get_gacha_icon_genshin(item_id)
         elif game is Game.STARRAIL:
             return self.get_gacha_icon_starrail(item_id)
         elif game is Game.ZZZ:
-            return f"https://stardb.gg/api/static/zzz/{item_id}.png"
+            return self.get_gacha_icon_zzz(item_id)
         elif game is Game.MC:
             return self.get_gacha_icon_mc(item_id)
         return DEFAULT_ICON
 
+    def get_gacha_icons(self, game: Game, keys: Iterable[str]) -> dict[str, str]:
+        """批量查找图标，相同物品只查找一次，开启图标代理时返回本地缓存的地址"""
+        return {key: get_proxy_url(self.get_gacha_icon(game, key)) for key in set(keys)}
+
+
+class Assets:
+    def __init__(self):
+        self._tables: Optional[AssetsTables] = None
+        self._load_lock = threading.Lock()
+
+    @property
+    def tables(self) -> AssetsTables:
+        """当前版本的图标表，首次使用时读取"""
+        tables = self._tables
+        if tables is None:
+            with self._load_lock:
+                if self._tables is None:
+                    self._tables = AssetsTables.load()
+                tables = self._tables
+        return tables
+
+    async def reload(self) -> bool:
+        """资源文件有变化时重新读取并替换，读取失败时保留当前版本
+        :return: 是否替换
+        """
+        version = await asyncio.to_thread(get_assets_version)
+        if self._tables is not None and self._tables.version == version:
+            return False
+        try:
+            tables = await asyncio.to_thread(AssetsTables.load)
+        except (OSError, ValueError) as exc:
+            logger.warning("Failed to reload assets: %r", exc)
+            return False
+        if self._tables is not None:
+            logger.info("Assets reloaded, hash %s", tables.hash[:16])
+        self._tables = tables
+        return True
+
+    def get_gacha_icon(self, game: Game, item_id: str) -> str:
+        return self.tables.get_gacha_icon(game, item_id)
+
+    def get_gacha_icons(self, game: Game, keys: Iterable[str]) -> dict[str, str]:
+        return self.tables.get_gacha_icons(game, keys)
+
     def get_hash(self) -> str:
-        return self.genshin_assets["hash"] + self.mc_assets["hash"]
+        """资源版本，资源文件更新后改变"""
+        return self.tables.hash
 
 
 assets = Assets()
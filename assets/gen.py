@@ -1,94 +1,225 @@
+import asyncio
 import hashlib
 from pathlib import Path
+from typing import Callable, NamedTuple, Optional
 
-import aiofiles
 import ujson
-from httpx import AsyncClient
+from httpx import AsyncClient, HTTPError, Limits
+
+from web_app.files import atomic_write
 
 ASSETS_PATH = Path("assets")
 ASSETS_GS_PATH = ASSETS_PATH / "genshin.json"
+ASSETS_HSR_PATH = ASSETS_PATH / "hsr.json"
+ASSETS_ZZZ_PATH = ASSETS_PATH / "zzz.json"
 ASSETS_MC_PATH = ASSETS_PATH / "mc.json"
+ASSETS_HTTP_CACHE_PATH = ASSETS_PATH / ".http_cache.json"
+"""各数据源的 ETag / Last-Modified 和上次解析的结果，用于条件请求"""
 
+YATTA_URL = "https://gi.yatta.moe"
+HAKUSH_URL = "https://api.hakush.in"
+STARDB_URL = "https://stardb.gg"
+
+
+class AssetsSource(NamedTuple):
+    path: Path
+    """生成的资源文件"""
+    url: str
+    """数据源地址"""
+    parse: Callable[[dict], dict[str, str]]
+    """把数据源转换为 名称/id -> 图标地址"""
+
+
+def load_json_file(path: Path) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return ujson.load(f)
+    except FileNotFoundError:
+        return {}
 
-class AssetsGen:
-    def __init__(self):
-        self.client = AsyncClient(follow_redirects=True)
 
-    async def fetch(self, url: str) -> dict:
-        response = await self.client.get(url)
-        return response.json()
+class AssetsGen:
+    def __init__(
+        self,
+        *,
+        yatta_url: str = YATTA_URL,
+        hakush_url: str = HAKUSH_URL,
+        stardb_url: str = STARDB_URL,
+        concurrency: int = 8,
+        client: Optional[AsyncClient] = None,
+    ):
+        self.yatta_url = yatta_url
+        self.hakush_url = hakush_url
+        self.stardb_url = stardb_url
+        self.concurrency = concurrency
+        self.client = client or AsyncClient(
+            follow_redirects=True, limits=Limits(max_connections=concurrency)
+        )
+        self.http_cache: dict[str, dict] = load_json_file(ASSETS_HTTP_CACHE_PATH)
+
+    @property
+    def sources(self) -> list[AssetsSource]:
+        return [
+            AssetsSource(ASSETS_GS_PATH, f"{self.yatta_url}/api/v2/chs/avatar", self.parse_gs),
+            AssetsSource(ASSETS_GS_PATH, f"{self.yatta_url}/api/v2/chs/weapon", self.parse_gs),
+            AssetsSource(ASSETS_HSR_PATH, f"{self.hakush_url}/hsr/data/character.json", self.parse_hsr_avatars),
+            AssetsSource(ASSETS_HSR_PATH, f"{self.hakush_url}/hsr/data/lightcone.json", self.parse_hsr_light_cones),
+            AssetsSource(ASSETS_ZZZ_PATH, f"{self.hakush_url}/zzz/data/character.json", self.parse_zzz),
+            AssetsSource(ASSETS_ZZZ_PATH, f"{self.hakush_url}/zzz/data/weapon.json", self.parse_zzz),
+            AssetsSource(ASSETS_ZZZ_PATH, f"{self.hakush_url}/zzz/data/bangboo.json", self.parse_zzz),
+            AssetsSource(ASSETS_MC_PATH, f"{self.hakush_url}/ww/data/character.json", self.parse_mc),
+            AssetsSource(ASSETS_MC_PATH, f"{self.hakush_url}/ww/data/weapon.json", self.parse_mc),
+        ]
+
+    async def fetch(self, source: AssetsSource) -> dict[str, str]:
+        """带条件请求地获取数据源，未更新时返回上次解析的结果"""
+        cached = self.http_cache.get(source.url)
+        headers = {}
+        if cached and cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached and cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+        response = await self.client.get(source.url, headers=headers)
+        if response.status_code == 304 and cached:
+            return cached["data"]
+        response.raise_for_status()
+        data = source.parse(response.json())
+        self.http_cache[source.url] = {
+            "etag": response.headers.get("etag"),
+            "last_modified": response.headers.get("last-modified"),
+            "data": data,
+        }
+        return data
 
     # gs
 
-    async def fetch_avatars_gs(self):
-        data = await self.fetch("https://gi.yatta.moe/api/v2/chs/avatar")
+    def parse_gs(self, data: dict) -> dict[str, str]:
+        return {
+            item["name"]: f"{self.yatta_url}/assets/UI/{item['icon']}.png"
+            for item in data["data"]["items"].values()
+        }
+
+    # hsr
+
+    def get_icon_url_hsr(self, item_id: str, kind: str) -> str:
+        return f"{self.stardb_url}/api/static/StarRailResWebp/icon/{kind}/{item_id}.webp"
+
+    def parse_hsr(self, data: dict, kind: str) -> dict[str, str]:
         new_data = {}
-        for item in data["data"]["items"].values():
-            new_data[item["name"]] = (
-                f"https://gi.yatta.moe/assets/UI/{item['icon']}.png"
-            )
+        for item_id, item in data.items():
+            url = self.get_icon_url_hsr(item_id, kind)
+            new_data[item_id] = url
+            if item.get("cn"):
+                new_data[item["cn"]] = url
         return new_data
 
-    async def fetch_weapons_gs(self):
-        data = await self.fetch("https://gi.yatta.moe/api/v2/chs/weapon")
+    def parse_hsr_avatars(self, data: dict) -> dict[str, str]:
+        return self.parse_hsr(data, "character")
+
+    def parse_hsr_light_cones(self, data: dict) -> dict[str, str]:
+        return self.parse_hsr(data, "light_cone")
+
+    # zzz
+
+    def parse_zzz(self, data: dict) -> dict[str, str]:
         new_data = {}
-        for item in data["data"]["items"].values():
-            new_data[item["name"]] = (
-                f"https://gi.yatta.moe/assets/UI/{item['icon']}.png"
-            )
+        for item_id, item in data.items():
+            url = f"{self.stardb_url}/api/static/zzz/{item_id}.png"
+            new_data[item_id] = url
+            if item.get("CHS"):
+                new_data[item["CHS"]] = url
         return new_data
 
-    async def main_gs(self):
-        data = {}
-        avatars = await self.fetch_avatars_gs()
-        data.update(avatars)
-        weapons = await self.fetch_weapons_gs()
-        data.update(weapons)
-        data["hash"] = hashlib.sha256(",".join(data.values()).encode()).hexdigest()
-        async with aiofiles.open(ASSETS_GS_PATH, "w", encoding="utf-8") as f:
-            await f.write(ujson.dumps(data, ensure_ascii=False, indent=4))
-
     # MC
-    @staticmethod
-    def get_icon_url_mc(path: str) -> str:
+
+    def get_icon_url_mc(self, path: str) -> str:
         new_path = path.replace("Game/Aki", "ww")
         ext = new_path.split(".")[-1]
         if ext != "webp":
             ext_index = new_path.rfind(ext)
             new_path = new_path[:ext_index] + "webp"
-        return f"https://api.hakush.in{new_path}"
+        return f"{self.hakush_url}{new_path}"
 
-    async def fetch_avatars_mc(self):
-        data = await self.fetch("https://api.hakush.in/ww/data/character.json")
-        new_data = {}
-        for item in data.values():
-            new_data[item["zh-Hans"]] = self.get_icon_url_mc(item["icon"])
-        return new_data
+    def parse_mc(self, data: dict) -> dict[str, str]:
+        return {item["zh-Hans"]: self.get_icon_url_mc(item["icon"]) for item in data.values()}
 
-    async def fetch_weapons_mc(self):
-        data = await self.fetch("https://api.hakush.in/ww/data/weapon.json")
-        new_data = {}
-        for item in data.values():
-            new_data[item["zh-Hans"]] = self.get_icon_url_mc(item["icon"])
-        return new_data
+    @staticmethod
+    async def write_assets(path: Path, data: dict[str, str]) -> bool:
+        """内容变化时才写入，hash 随之更新
+        :return: 是否写入
+        """
+        old_data = load_json_file(path)
+        old_data.pop("hash", None)
+        if old_data == data:
+            return False
+        data = {**data, "hash": hashlib.sha256(",".join(data.values()).encode()).hexdigest()}
+        # 原子替换，运行中的服务热更新时不会读到不完整的文件
+        await atomic_write(path, ujson.dumps(data, ensure_ascii=False, indent=4).encode())
+        return True
+
+    async def main(self) -> list[Path]:
+        """并发获取所有数据源，生成各游戏的资源文件
+        :return: 有更新的资源文件
+        """
+        sources = self.sources
+        # 传入的 client 不一定限制了连接数，在这里统一限制并发
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def fetch(source: AssetsSource) -> dict[str, str]:
+            async with semaphore:
+                return await self.fetch(source)
+
+        results = await asyncio.gather(
+            *(fetch(source) for source in sources), return_exceptions=True
+        )
+        merged: dict[Path, dict[str, str]] = {}
+        failed: set[Path] = set()
+        for source, result in zip(sources, results):
+            if isinstance(result, (HTTPError, ValueError, KeyError)):
+                print(f"failed to fetch {source.url}: {result!r}")
+                failed.add(source.path)
+                continue
+            if isinstance(result, BaseException):
+                raise result
+            merged.setdefault(source.path, {}).update(result)
+        changed = []
+        for path, data in merged.items():
+            # 部分数据源失败时保留原文件，避免丢失图标
+            if path not in failed and await self.write_assets(path, data):
+                changed.append(path)
+        await atomic_write(
+            ASSETS_HTTP_CACHE_PATH, ujson.dumps(self.http_cache, ensure_ascii=False).encode()
+        )
+        return changed
 
-    async def main_mc(self):
-        data = {}
-        avatars = await self.fetch_avatars_mc()
-        data.update(avatars)
-        weapons = await self.fetch_weapons_mc()
-        data.update(weapons)
-        data["hash"] = hashlib.sha256(",".join(data.values()).encode()).hexdigest()
-        async with aiofiles.open(ASSETS_MC_PATH, "w", encoding="utf-8") as f:
-            await f.write(ujson.dumps(data, ensure_ascii=False, indent=4))
+    @staticmethod
+    async def prefetch_icons():
+        """把所有图标下载到本地图标缓存"""
+        from fast_app.functions.icons import icon_cache
 
-    async def main(self):
-        await self.main_gs()
-        await self.main_mc()
+        urls = []
+        for path in (ASSETS_GS_PATH, ASSETS_HSR_PATH, ASSETS_ZZZ_PATH, ASSETS_MC_PATH):
+            urls.extend(v for k, v in load_json_file(path).items() if k != "hash")
+        try:
+            count = await icon_cache.prefetch(urls)
+        finally:
+            await icon_cache.close()
+        print(f"prefetched {count}/{len(set(urls))} icons")
 
 
 if __name__ == "__main__":
-    import asyncio
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--prefetch-icons", action="store_true", help="同时缓存所有图标")
+    args = parser.parse_args()
+
+    async def run():
+        gen = AssetsGen()
+        async with gen.client:
+            changed = await gen.main()
+        print(f"updated: {', '.join(map(str, changed)) or 'none'}")
+        if args.prefetch_icons:
+            await gen.prefetch_icons()
 
-    gen = AssetsGen()
-    asyncio.run(gen.main())
+    asyncio.run(run())
@@ -0,0 +1,76 @@
+"""冷启动并发加载基准测试
+
+    python -m benchmarks.concurrent_load --users 64 --pulls 20000
+
+分别统计按 uid 合并加载和旧的全局锁两种方式下，大量不同 uid 同时冷加载时的延迟分布。
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.utils import print_latencies, write_histories
+from web_app.enums import Game
+from web_app.games import GachaLogFunctions
+from web_app.games.cache import history_cache
+from web_app.games.genshin import GachaLogInfo
+from web_app.games.snapshot import SNAPSHOT_SUFFIX
+
+
+class GlobalLockGachaLogFunctions(GachaLogFunctions):
+    """模拟旧实现：整个游戏共用一把锁"""
+
+    def __init__(self, game: Game, info_type):
+        super().__init__(game, info_type)
+        self.lock = asyncio.Lock()
+
+    async def get_history_info(self, uid: int):
+        async with self.lock:
+            return await super().get_history_info(uid)
+
+
+async def run(functions: GachaLogFunctions, uids: list[int], repeat: int):
+    async def request(uid: int) -> float:
+        start = time.perf_counter()
+        await functions.get_history_info(uid)
+        return time.perf_counter() - start
+
+    # 每个 uid 发起 repeat 个并发请求，同一 uid 只应加载一次
+    tasks = [request(uid) for uid in uids for _ in range(repeat)]
+    return await asyncio.gather(*tasks)
+
+
+async def main(users: int, pulls: int, repeat: int):
+    uids = list(range(100000000, 100000000 + users))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp)
+        write_histories(path, uids, pulls)
+        # 预先启动解码进程池，不计入加载耗时
+        warmup_path = path / f"{uids[0]}.json"
+        await GachaLogFunctions(Game.GENSHIN, GachaLogInfo).decode_history_file(
+            warmup_path, os.stat(warmup_path)
+        )
+        for name, cls in (
+            ("per-uid single-flight", GachaLogFunctions),
+            ("global lock", GlobalLockGachaLogFunctions),
+        ):
+            # 两种方式都从 JSON 冷加载
+            history_cache.clear()
+            for snapshot_path in path.glob(f"*{SNAPSHOT_SUFFIX}"):
+                snapshot_path.unlink()
+            functions = cls(Game.GENSHIN, GachaLogInfo)
+            functions.gacha_log_path = path
+            latencies = await run(functions, uids, repeat)
+            print_latencies(name, latencies)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=64)
+    parser.add_argument("--pulls", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=4)
+    args = parser.parse_args()
+    asyncio.run(main(args.users, args.pulls, args.repeat))
@@ -0,0 +1,52 @@
+"""冷加载首页耗时随总抽数的变化
+
+    python -m benchmarks.first_page --pulls 1000 10000 100000
+
+快照已存在、内存缓存为空时，读取一个卡池第一页和卡池统计的耗时。
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.utils import write_histories
+from web_app.enums import Game
+from web_app.games import GachaLogFunctions
+from web_app.games.cache import history_cache
+from web_app.games.genshin import GachaLogInfo
+from web_app.schema import GachaParams
+
+
+async def measure(functions: GachaLogFunctions, uid: int, repeat: int) -> float:
+    params = GachaParams(account_id="", uid=uid, banner_type="角色祈愿", size=20)
+    times = []
+    for _ in range(repeat):
+        history_cache.clear()
+        start = time.perf_counter()
+        await functions.get_gacha_logs_page(params)
+        await functions.get_gacha_stats(params)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+async def main(pulls_list: list[int], repeat: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp)
+        functions = GachaLogFunctions(Game.GENSHIN, GachaLogInfo)
+        functions.gacha_log_path = path
+        for uid, pulls in enumerate(pulls_list, start=100000000):
+            write_histories(path, [uid], pulls)
+            # 首次读取时从 JSON 生成快照
+            await functions.get_history_info(uid)
+            best = await measure(functions, uid, repeat)
+            print(f"pulls={pulls}: first page best={best * 1000:.2f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pulls", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.pulls, args.repeat))
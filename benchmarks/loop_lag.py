@@ -0,0 +1,64 @@
+"""冷加载期间的事件循环延迟
+
+    python -m benchmarks.loop_lag --users 16 --pulls 40000
+
+分别以 inline、thread、process 三种执行器从 JSON 冷加载一批抽卡记录，同时统计事件循环延迟。
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.utils import write_histories
+from fast_app.functions.loop_monitor import LoopLagMonitor
+from web_app.enums import Game
+from web_app.games import GachaLogFunctions
+from web_app.games.cache import history_cache
+from web_app.games.decoder import history_decoder
+from web_app.games.genshin import GachaLogInfo
+from web_app.games.snapshot import SNAPSHOT_SUFFIX
+
+
+async def run(path: Path, uids: list[int], executor: str):
+    history_cache.clear()
+    for snapshot_path in path.glob(f"*{SNAPSHOT_SUFFIX}"):
+        snapshot_path.unlink()
+    history_decoder.shutdown()
+    history_decoder.executor_type = executor
+    functions = GachaLogFunctions(Game.GENSHIN, GachaLogInfo)
+    functions.gacha_log_path = path
+    # 与服务启动时相同，预先启动执行器，不计入加载耗时
+    await history_decoder.start()
+
+    monitor = LoopLagMonitor(interval=0.01, warning=float("inf"))
+    monitor.start()
+    start = time.perf_counter()
+    await asyncio.gather(*(functions.get_history_info(uid) for uid in uids))
+    elapsed = time.perf_counter() - start
+    await monitor.stop()
+    stats = monitor.stats()
+    print(
+        f"{executor}: total={elapsed * 1000:.0f}ms "
+        f"lag p50={stats.get('p50_ms', 0):.1f}ms p99={stats.get('p99_ms', 0):.1f}ms "
+        f"max={stats.get('max_ms', 0):.1f}ms"
+    )
+
+
+async def main(users: int, pulls: int):
+    uids = list(range(100000000, 100000000 + users))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp)
+        write_histories(path, uids, pulls)
+        for executor in ("inline", "thread", "process"):
+            await run(path, uids, executor)
+    history_decoder.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=16)
+    parser.add_argument("--pulls", type=int, default=40000)
+    args = parser.parse_args()
+    asyncio.run(main(args.users, args.pulls))
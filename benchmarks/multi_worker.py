@@ -0,0 +1,141 @@
+"""多 worker 吞吐基准测试
+
+    python -m benchmarks.multi_worker --workers 1 2 4 --users 32 --pulls 20000
+
+在临时目录中分别以不同的 worker 数启动服务，上传一批抽卡记录后并发请求 /api/gacha_log，
+统计每秒请求数。请求不带 If-None-Match，且按卡池、星级、页码轮换，尽量避免只测到 304。
+"""
+
+import argparse
+import asyncio
+import itertools
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+import ujson
+
+from benchmarks.utils import BANNERS, make_history, print_latencies
+
+ROOT = Path(__file__).resolve().parent.parent
+PB_TOKEN = "benchmark"
+
+
+def get_free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(cwd: Path, port: int, workers: int) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "PYTHONPATH": str(ROOT),
+        "PB_TOKEN": PB_TOKEN,
+        "TOKEN_URL": f"sqlite:///{cwd / 'tokens.sqlite3'}",
+    }
+    return subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "main:app",
+            "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(workers), "--log-level", "warning",
+        ],
+        cwd=cwd,
+        env=env,
+    )
+
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            await client.get("/api/gacha_log")
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.2)
+    raise TimeoutError("server did not start")
+
+
+async def upload(client: httpx.AsyncClient, uids: list[int], pulls: int) -> list[str]:
+    account_ids = []
+    for uid in uids:
+        content = ujson.dumps(make_history(uid, pulls), ensure_ascii=False).encode()
+        response = await client.post(
+            "/upload",
+            data={"token": PB_TOKEN, "uid": str(uid), "game": "genshin"},
+            files={"file": ("gacha_log.json", content)},
+        )
+        response.raise_for_status()
+        account_ids.append(response.json()["account_id"])
+    return account_ids
+
+
+async def drive(
+    client: httpx.AsyncClient, account_ids: list[str], requests: int, concurrency: int
+) -> tuple[float, list[float]]:
+    queries = itertools.cycle(
+        {"account_id": account_id, "banner_type": banner, "rarities": rarities, "page": page}
+        for page in (1, 2, 3)
+        for rarities in ("", "5", "4,5")
+        for banner in BANNERS[:3]
+        for account_id in account_ids
+    )
+    latencies = []
+
+    async def worker():
+        while len(latencies) < requests:
+            params = {k: v for k, v in next(queries).items() if v}
+            start = time.perf_counter()
+            response = await client.get("/api/gacha_log", params=params)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - start, latencies
+
+
+async def run(workers: int, users: int, pulls: int, requests: int, concurrency: int):
+    uids = list(range(100000000, 100000000 + users))
+    with tempfile.TemporaryDirectory() as tmp:
+        cwd = Path(tmp)
+        # 资源文件按相对路径读取
+        (cwd / "assets").symlink_to(ROOT / "assets")
+        port = get_free_port()
+        process = start_server(cwd, port, workers)
+        try:
+            limits = httpx.Limits(max_connections=concurrency)
+            async with httpx.AsyncClient(
+                base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60
+            ) as client:
+                await wait_ready(client)
+                account_ids = await upload(client, uids, pulls)
+                # 预热：每个 worker 都从快照加载一遍
+                await drive(client, account_ids, users * workers * 2, concurrency)
+                elapsed, latencies = await drive(client, account_ids, requests, concurrency)
+        finally:
+            process.terminate()
+            process.wait()
+    print(f"workers={workers}: {len(latencies) / elapsed:.0f} req/s")
+    print_latencies(f"workers={workers}", latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--users", type=int, default=32)
+    parser.add_argument("--pulls", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    args = parser.parse_args()
+    for workers in args.workers:
+        asyncio.run(run(workers, args.users, args.pulls, args.requests, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""快照与 JSON 冷加载对比
+
+    python -m benchmarks.snapshot_load --pulls 40000
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from benchmarks.utils import write_histories
+from web_app.enums import Game
+from web_app.games import GachaLogFunctions
+from web_app.games.genshin import GachaLogInfo
+from web_app.games.snapshot import SNAPSHOT_SUFFIX, load_snapshot
+
+
+async def main(pulls: int, repeat: int):
+    uid = 100000000
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp)
+        write_histories(path, [uid], pulls)
+        functions = GachaLogFunctions(Game.GENSHIN, GachaLogInfo)
+        functions.gacha_log_path = path
+        file_path = functions.get_file_path(uid)
+        snapshot_path = file_path.with_suffix(SNAPSHOT_SUFFIX)
+
+        stat = os.stat(file_path)
+        json_times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            content = await functions.decode_history_file(file_path, stat)
+            json_times.append(time.perf_counter() - start)
+        await functions.write_snapshot(file_path, content)
+        history_info = load_snapshot(content, functions.info_type, stat)
+
+        snapshot_times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            snapshot_info = await functions.load_history_info(uid)
+            snapshot_times.append(time.perf_counter() - start)
+        assert {k: len(v) for k, v in snapshot_info.item_list.items()} == {
+            k: len(v) for k, v in history_info.item_list.items()
+        }
+
+        for name, times, size in (
+            ("json", json_times, file_path.stat().st_size),
+            ("snapshot", snapshot_times, snapshot_path.stat().st_size),
+        ):
+            print(
+                f"{name}: pulls={pulls} best={min(times) * 1000:.1f}ms "
+                f"bytes_read={size}"
+            )
+
+        # 对比列式存储与逐条 pydantic 模型的内存占用
+        content = await functions.load_bytes(file_path)
+        tracemalloc.start()
+        models = functions.info_type.model_validate_json(content)
+        models_size = tracemalloc.get_traced_memory()[0]
+        del models
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        columns = await functions.read_snapshot(file_path, os.stat(file_path))
+        columns_size = tracemalloc.get_traced_memory()[0] - baseline
+        tracemalloc.stop()
+        print(
+            f"memory: models={models_size} columns={columns_size} "
+            f"estimated={columns.nbytes}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pulls", type=int, default=40000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.pulls, args.repeat))
@@ -0,0 +1,75 @@
+"""卡池统计基准测试
+
+    python -m benchmarks.stats --pulls 100000
+
+对比基于索引的统计与逐条遍历的统计在大量抽卡记录下的耗时。
+"""
+
+import argparse
+import time
+
+from benchmarks.utils import make_history
+from web_app.enums import Game
+from web_app.games.columns import GachaLogColumns
+from web_app.games.genshin import GachaLogInfo
+from web_app.games.stats import STANDARD_ITEMS, compute_banner_stats, is_standard_item
+
+
+def naive_stats(items, top_rank: int, standard_items: dict) -> tuple:
+    pity = top_count = second_count = wins = losses = 0
+    pities = []
+    guaranteed = False
+    for item in items:
+        pity += 1
+        if item.rank_type == top_rank - 1:
+            second_count += 1
+        if item.rank_type == top_rank:
+            top_count += 1
+            pities.append(pity)
+            pity = 0
+            is_standard = is_standard_item(standard_items, item.name, item.time)
+            if not guaranteed:
+                wins, losses = (wins, losses + 1) if is_standard else (wins + 1, losses)
+            guaranteed = is_standard
+    return pity, top_count, second_count, pities, wins, losses
+
+
+def main(pulls: int, repeat: int):
+    # 全部放进同一个卡池
+    history = make_history(100000000, pulls)
+    history["item_list"]["角色祈愿"] = [
+        item for items in history["item_list"].values() for item in items
+    ]
+    history_info = GachaLogInfo.model_validate(history)
+    columns = GachaLogColumns.from_info(history_info).item_list["角色祈愿"]
+    items = history_info.item_list["角色祈愿"]
+    standard_items = STANDARD_ITEMS[Game.GENSHIN]
+
+    start = time.perf_counter()
+    columns.index  # 索引随数据加载构建一次，不计入统计耗时
+    print(f"index build: pulls={len(columns)} {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    for name, func in (
+        ("indexed", lambda: compute_banner_stats(columns, 5, standard_items)),
+        ("naive loop", lambda: naive_stats(items, 5, standard_items)),
+    ):
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start)
+        print(f"{name}: best={min(times) * 1000:.2f}ms")
+
+    stats = compute_banner_stats(columns, 5, standard_items)
+    pity, top_count, second_count, pities, wins, losses = naive_stats(items, 5, standard_items)
+    assert (stats.pity, stats.top_count, stats.second_count) == (pity, top_count, second_count)
+    assert (stats.wins, stats.losses) == (wins, losses)
+    assert sum(k * v for k, v in stats.pity_histogram.items()) == sum(pities)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pulls", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    main(args.pulls, args.repeat)
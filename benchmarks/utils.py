@@ -0,0 +1,63 @@
+import datetime
+import random
+import statistics
+from pathlib import Path
+
+import ujson
+
+NAMES = {
+    5: ["迪卢克", "琴", "莫娜", "七七", "刻晴", "提纳里", "迪希雅", "纳西妲", "雷电将军"],
+    4: ["香菱", "行秋", "班尼特", "菲谢尔", "砂糖", "北斗", "凝光", "重云", "诺艾尔"],
+    3: ["弹弓", "神射手之誓", "鸦羽弓", "翡玉法球", "讨龙英杰谭", "魔导绪论", "黑缨枪"],
+}
+BANNERS = ["角色祈愿", "武器祈愿", "常驻祈愿", "新手祈愿", "集录祈愿"]
+
+
+def make_history(uid: int, pulls: int, seed: int = 0) -> dict:
+    """生成一份合成的抽卡记录，pulls 为总抽数"""
+    rnd = random.Random(seed or uid)
+    start = datetime.datetime(2020, 9, 28, tzinfo=datetime.timezone.utc)
+    item_list = {banner: [] for banner in BANNERS}
+    item_id = 1700000000000000000 + uid * 1000000
+    for index in range(pulls):
+        banner = BANNERS[index % 3]
+        roll = rnd.random()
+        rank = 5 if roll < 0.016 else 4 if roll < 0.146 else 3
+        item_list[banner].append(
+            {
+                "id": str(item_id + index),
+                "name": rnd.choice(NAMES[rank]),
+                "gacha_type": "301",
+                "item_type": "角色" if rank == 5 else "武器",
+                "rank_type": rank,
+                "time": (start + datetime.timedelta(minutes=index)).isoformat(),
+            }
+        )
+    return {
+        "user_id": str(uid),
+        "uid": str(uid),
+        "update_time": start.isoformat(),
+        "item_list": item_list,
+    }
+
+
+def write_histories(path: Path, uids: list[int], pulls: int) -> None:
+    path.mkdir(exist_ok=True, parents=True)
+    for uid in uids:
+        with open(path / f"{uid}.json", "w", encoding="utf-8") as f:
+            ujson.dump(make_history(uid, pulls), f, ensure_ascii=False)
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[int(pct) - 1]
+
+
+def print_latencies(title: str, latencies: list[float]) -> None:
+    print(
+        f"{title}: n={len(latencies)} "
+        f"p50={percentile(latencies, 50) * 1000:.1f}ms "
+        f"p99={percentile(latencies, 99) * 1000:.1f}ms "
+        f"max={max(latencies) * 1000:.1f}ms"
+    )
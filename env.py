@@ -1,3 +1,5 @@
+from typing import Literal
+
 import dotenv
 from pydantic.v1 import BaseSettings
 
@@ -16,6 +18,10 @@ class Settings(BaseSettings):
 class PBConfig(Settings):
     token: str = ""
     """pb token for upload"""
+    max_upload_size: int = 64 * 1024 * 1024
+    """上传文件解压后的最大字节数"""
+    upload_chunk_size: int = 64 * 1024
+    """上传文件分块写入的大小"""
 
     class Config(Settings.Config):
         env_prefix = "pb_"
@@ -24,14 +30,99 @@ class PBConfig(Settings):
 class WebConfig(Settings):
     host: str = "0.0.0.0"
     port: int = 5688
+    workers: int = 1
+    """worker 进程数，大于 1 时需配合共享的 token 存储和会话保持的反向代理"""
+    grid_chunk_size: int = 60
+    """抽卡记录页首次渲染的物品数，其余随滚动分批加载，0 表示一次渲染整页"""
 
     class Config(Settings.Config):
         env_prefix = "web_"
 
 
+class CacheConfig(Settings):
+    max_entries: int = 256
+    """最多缓存的抽卡记录数量"""
+    max_bytes: int = 512 * 1024 * 1024
+    """抽卡记录缓存的估算内存上限"""
+    ttl: int = 3600
+    """缓存过期时间（秒），每次访问都会重新计时"""
+    sweep_interval: int = 300
+    """清理过期缓存的间隔（秒）"""
+    max_filter_results: int = 16
+    """每个卡池缓存的筛选结果数量"""
+    max_filter_bytes: int = 4 * 1024 * 1024
+    """每个卡池缓存的筛选结果的字节数上限，计入抽卡记录缓存的内存占用"""
+    version_check_interval: float = 1.0
+    """重新检查抽卡记录文件是否更新的间隔（秒），多 worker 时其他 worker 的上传最多延迟这么久生效"""
+
+    class Config(Settings.Config):
+        env_prefix = "cache_"
+
+
+class TokenConfig(Settings):
+    url: str = "sqlite:///data/tokens.sqlite3"
+    """account_id 映射存储，支持 sqlite:///path、redis://host:port/db 和 mem://"""
+    ttl: int = 30 * 24 * 3600
+    """account_id 有效期（秒），为 0 时不过期"""
+    local_ttl: int = 60
+    """进程内读缓存的有效期（秒）"""
+    sweep_interval: int = 3600
+    """清理过期 account_id 的间隔（秒）"""
+
+    class Config(Settings.Config):
+        env_prefix = "token_"
+
+
+class LoaderConfig(Settings):
+    executor: Literal["process", "thread", "inline"] = "process"
+    """解码 JSON 抽卡记录的执行器：process 进程池、thread 线程池、inline 直接在事件循环中执行"""
+    max_workers: int = 2
+    """执行器的最大并发数，为 0 时使用默认值"""
+
+    class Config(Settings.Config):
+        env_prefix = "loader_"
+
+
+class MonitorConfig(Settings):
+    loop_lag_interval: float = 0.5
+    """检测事件循环延迟的间隔（秒）"""
+    loop_lag_warning: float = 0.1
+    """事件循环延迟超过该值（秒）时记录警告"""
+
+    class Config(Settings.Config):
+        env_prefix = "monitor_"
+
+
+class IconConfig(Settings):
+    proxy: bool = False
+    """是否通过本地缓存代理第三方图标"""
+    cache_path: str = "data/icons"
+    """图标缓存目录"""
+    size: int = 200
+    """缩略图最大边长，GachaLogPage 每格 100px，按 2 倍屏生成"""
+    max_age: int = 30 * 24 * 3600
+    """浏览器缓存时间（秒）"""
+    allowed_hosts: list[str] = ["gi.yatta.moe", "stardb.gg", "api.hakush.in"]
+    """允许代理的图标域名"""
+    timeout: float = 10
+    """下载图标的超时时间（秒）"""
+    max_size: int = 5 * 1024 * 1024
+    """下载图标的最大字节数，超过时视为下载失败"""
+    reload_interval: int = 60
+    """检查图标表（assets/*.json）更新的间隔（秒），0 表示不检查"""
+
+    class Config(Settings.Config):
+        env_prefix = "icon_"
+
+
 class ApplicationConfig(Settings):
     pb: PBConfig = PBConfig()
     web: WebConfig = WebConfig()
+    cache: CacheConfig = CacheConfig()
+    token: TokenConfig = TokenConfig()
+    loader: LoaderConfig = LoaderConfig()
+    monitor: MonitorConfig = MonitorConfig()
+    icon: IconConfig = IconConfig()
 
 
 ApplicationConfig.update_forward_refs()
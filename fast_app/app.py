@@ -2,20 +2,81 @@ from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 import flet.fastapi as flet_fastapi
+
+from assets.assets import assets
+from env import config
+from web_app.games.cache import history_cache
+from web_app.games.decoder import history_decoder
+from .endpoints.gacha_log import router as gacha_log_router
+from .endpoints.icons import router as icons_router
+from .endpoints.metrics import router as metrics_router
 from .endpoints.pb import router as pb_router
+from .functions.icons import icon_cache
+from .functions.loop_monitor import loop_monitor
+from .functions.token_store import token_store
+from .middleware import UploadSizeLimitMiddleware
 from .scheduler import scheduler
 
 
+async def sweep_history_cache():
+    """在事件循环中清理，避免与请求中的读写并发修改缓存"""
+    history_cache.sweep()
+
+
 @asynccontextmanager
 async def lifespan(_: FastAPI):
+    token_store.setup(config.token.url, local_ttl=config.token.local_ttl)
     await flet_fastapi.app_manager.start()
+    loop_monitor.start()
+    scheduler.add_job(
+        sweep_history_cache,
+        "interval",
+        id="history_cache_sweep",
+        name="history_cache_sweep",
+        seconds=config.cache.sweep_interval,
+        replace_existing=True,
+    )
+    scheduler.add_job(
+        token_store.sweep,
+        "interval",
+        id="token_store_sweep",
+        name="token_store_sweep",
+        seconds=config.token.sweep_interval,
+        replace_existing=True,
+    )
+    if config.icon.reload_interval > 0:
+        scheduler.add_job(
+            assets.reload,
+            "interval",
+            id="assets_reload",
+            name="assets_reload",
+            seconds=config.icon.reload_interval,
+            replace_existing=True,
+        )
+    # 在线程中读取图标表，避免首个请求时阻塞事件循环
+    await assets.reload()
+    # 预先启动解码进程池，避免第一个冷加载的用户承担子进程的启动耗时
+    await history_decoder.start()
     if not scheduler.running:
         scheduler.start()
     yield
     await flet_fastapi.app_manager.shutdown()
     if scheduler.running:
         scheduler.shutdown()
+    await token_store.close()
+    await icon_cache.close()
+    await loop_monitor.stop()
+    history_decoder.shutdown()
 
 
 app = FastAPI(lifespan=lifespan)
+# 额外预留表单字段的大小；压缩上传时解压后的大小在写入时再检查
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    path="/upload",
+    max_size=config.pb.max_upload_size + 64 * 1024,
+)
 app.include_router(pb_router)
+app.include_router(gacha_log_router)
+app.include_router(metrics_router)
+app.include_router(icons_router)
@@ -0,0 +1,68 @@
+import hashlib
+from typing import Any
+
+from fastapi import APIRouter, HTTPException, Request, Response
+from pydantic import BaseModel, ValidationError
+
+from fast_app.functions.pb import PBFunctions
+from web_app.enums import Game
+from web_app.games import get_gacha_log_functions
+from web_app.games.cache import history_versions
+from web_app.games.stats import BannerStats
+from web_app.schema import GachaParams
+from .utils import is_not_modified
+
+router = APIRouter(prefix="/api")
+
+
+class GachaLogReturnData(BaseModel):
+    game: Game
+    banner_type: str
+    page: int
+    size: int
+    total: int
+    max_page: int
+    items: list[dict[str, Any]]
+    stats: BannerStats | None = None
+
+
+async def get_etag(game: Game, uid: int, request: Request) -> str:
+    query = hashlib.sha1(str(request.query_params).encode()).hexdigest()[:16]
+    return f'W/"{await history_versions.get(game, uid)}-{query}"'
+
+
+@router.get("/gacha_log", response_model=GachaLogReturnData)
+async def get_gacha_log(request: Request, response: Response):
+    try:
+        params = GachaParams(**request.query_params)
+    except ValidationError as exc:
+        raise HTTPException(status_code=422, detail=exc.errors(include_url=False, include_context=False))
+    try:
+        game, uid = await PBFunctions.get_uid_by_hash(params.account_id)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="已失效，请尝试重新获取")
+    params.uid = uid
+
+    # 数据未更新时直接返回 304，不需要读取抽卡记录
+    etag = await get_etag(game, uid, request)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if is_not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    gacha_log_functions = get_gacha_log_functions(game)
+    try:
+        gacha_logs, total = await gacha_log_functions.get_gacha_logs_page(params)
+        stats = await gacha_log_functions.get_gacha_stats(params)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="已失效，请尝试重新获取")
+    response.headers.update(headers)
+    return GachaLogReturnData(
+        game=game,
+        banner_type=params.banner_type,
+        page=params.page,
+        size=params.size,
+        total=total,
+        max_page=(total + params.size - 1) // params.size,
+        items=[i.model_dump(mode="json") for i in gacha_logs],
+        stats=stats,
+    )
@@ -0,0 +1,25 @@
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import FileResponse
+
+from env import config
+from fast_app.functions.icons import IconFetchError, IconNotAllowedError, icon_cache
+from .utils import is_not_modified
+
+router = APIRouter(prefix="/api")
+
+
+@router.get("/icon")
+async def get_icon(request: Request, url: str):
+    if not config.icon.proxy:
+        raise HTTPException(status_code=404, detail="Not Found")
+    try:
+        icon = await icon_cache.get(url)
+    except IconNotAllowedError:
+        raise HTTPException(status_code=403, detail="Host not allowed")
+    except IconFetchError:
+        raise HTTPException(status_code=502, detail="Failed to fetch icon")
+    etag = f'"{icon.etag}"'
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={config.icon.max_age}"}
+    if is_not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(icon.path, media_type=icon.media_type, headers=headers)
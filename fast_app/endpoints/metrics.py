@@ -0,0 +1,16 @@
+from typing import Any
+
+from fastapi import APIRouter
+
+from fast_app.functions.loop_monitor import loop_monitor
+from web_app.games.cache import history_cache
+
+router = APIRouter(prefix="/api")
+
+
+@router.get("/metrics")
+async def get_metrics() -> dict[str, Any]:
+    return {
+        "loop_lag": loop_monitor.stats(),
+        "history_cache": history_cache.stats(),
+    }
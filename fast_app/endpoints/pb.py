@@ -2,7 +2,11 @@ from fastapi import APIRouter, UploadFile, Form, HTTPException
 from pydantic import BaseModel
 
 from env import config
-from fast_app.functions.pb import PBFunctions
+from fast_app.functions.pb import (
+    PBFunctions,
+    FileTooLargeError,
+    UnsupportedEncodingError,
+)
 from web_app.enums import Game
 
 router = APIRouter()
@@ -27,6 +31,13 @@ async def upload_file(
 ) -> PostFormReturnData:
     if token != config.pb.token:
         raise HTTPException(status_code=403, detail="Invalid token")
-    await PBFunctions.save_file(file, uid, game)
+    try:
+        await PBFunctions.save_file(file, uid, game)
+    except FileTooLargeError:
+        raise HTTPException(status_code=413, detail="File too large")
+    except UnsupportedEncodingError:
+        raise HTTPException(status_code=415, detail="Unsupported content encoding")
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
     account_id = await PBFunctions.create_hash(uid, game)
     return PostFormReturnData(account_id=account_id)
@@ -0,0 +1,9 @@
+from fastapi import Request
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    tags = [i.strip() for i in if_none_match.split(",")]
+    return "*" in tags or etag in tags or etag.removeprefix("W/") in tags
@@ -0,0 +1,187 @@
+"""第三方图标的本地缓存
+
+图标下载后缩放为缩略图，按内容的 sha256 保存在 objects 目录（相同图片只保存一份），
+refs 目录记录每个图标地址对应的内容。内容哈希同时作为 ETag，图标更新后地址对应的内容随之改变。
+
+缩放需要可选依赖 Pillow，未安装时原样保存。
+"""
+
+import asyncio
+import hashlib
+import io
+from pathlib import Path
+from typing import NamedTuple, Optional
+from urllib.parse import urlencode, urlparse
+
+import aiofiles
+import aiofiles.os
+from httpx import AsyncClient, HTTPError
+
+from env import config
+from web_app.files import atomic_write
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+ICON_ROUTE = "/api/icon"
+
+
+class IconNotAllowedError(Exception):
+    """图标地址不在允许代理的域名内"""
+
+
+class IconFetchError(Exception):
+    """图标下载失败或不是图片"""
+
+
+class IconFile(NamedTuple):
+    path: Path
+    etag: str
+    media_type: str
+
+
+def is_allowed_url(url: str) -> bool:
+    parsed = urlparse(url)
+    return parsed.scheme in ("http", "https") and parsed.hostname in config.icon.allowed_hosts
+
+
+def get_proxy_url(url: str) -> str:
+    """返回经过本地缓存的图标地址，本地资源和不允许代理的地址原样返回"""
+    if not config.icon.proxy or not is_allowed_url(url):
+        return url
+    return f"{ICON_ROUTE}?{urlencode({'url': url})}"
+
+
+def make_thumbnail(content: bytes, size: int) -> bytes:
+    """缩放为 webp 缩略图"""
+    try:
+        with Image.open(io.BytesIO(content)) as image:
+            image.thumbnail((size, size))
+            output = io.BytesIO()
+            image.save(output, format="WEBP", quality=85)
+    except (OSError, ValueError, Image.DecompressionBombError) as exc:
+        # 像素数过多的图片 Pillow 会拒绝解码
+        raise IconFetchError("Invalid image") from exc
+    return output.getvalue()
+
+
+class IconCache:
+    def __init__(self, path: Path, size: int, timeout: float, max_size: int):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self.max_size = max_size
+        self._client: Optional[AsyncClient] = None
+        self._loading: dict[str, asyncio.Task] = {}
+
+    @property
+    def client(self) -> AsyncClient:
+        if self._client is None:
+            self._client = AsyncClient(
+                follow_redirects=True,
+                timeout=self.timeout,
+                event_hooks={"request": [self.check_request]},
+            )
+        return self._client
+
+    @staticmethod
+    async def check_request(request) -> None:
+        """重定向后的地址同样需要在允许的域名内"""
+        if not is_allowed_url(str(request.url)):
+            raise IconNotAllowedError(str(request.url))
+
+    def get_object_path(self, digest: str) -> Path:
+        return self.path / "objects" / digest[:2] / digest
+
+    def get_ref_path(self, url: str) -> Path:
+        key = hashlib.sha256(f"{url}#{self.size}".encode()).hexdigest()
+        return self.path / "refs" / key[:2] / key
+
+    async def get(self, url: str) -> IconFile:
+        """取得缓存的图标，不存在时下载，同一地址的并发请求只下载一次"""
+        if not is_allowed_url(url):
+            raise IconNotAllowedError(url)
+        icon = await self.read_ref(url)
+        if icon is not None:
+            return icon
+        task = self._loading.get(url)
+        if task is None:
+            task = asyncio.create_task(self.fetch(url))
+            self._loading[url] = task
+            task.add_done_callback(lambda _: self._loading.pop(url, None))
+        return await asyncio.shield(task)
+
+    async def read_ref(self, url: str) -> Optional[IconFile]:
+        try:
+            async with aiofiles.open(self.get_ref_path(url), "r", encoding="utf-8") as f:
+                digest, media_type = (await f.read()).split()
+        except (FileNotFoundError, ValueError):
+            return None
+        path = self.get_object_path(digest)
+        if not await aiofiles.os.path.exists(path):
+            return None
+        return IconFile(path, digest, media_type)
+
+    async def fetch(self, url: str) -> IconFile:
+        try:
+            async with self.client.stream("GET", url) as response:
+                response.raise_for_status()
+                media_type = response.headers.get("content-type", "").split(";")[0].strip()
+                if not media_type.startswith("image/"):
+                    raise IconFetchError(url)
+                content = await self.read_body(response)
+        except HTTPError as exc:
+            raise IconFetchError(url) from exc
+        if Image is not None:
+            content = await asyncio.to_thread(make_thumbnail, content, self.size)
+            media_type = "image/webp"
+        digest = hashlib.sha256(content).hexdigest()
+        path = self.get_object_path(digest)
+        if not await aiofiles.os.path.exists(path):
+            await atomic_write(path, content)
+        await atomic_write(self.get_ref_path(url), f"{digest} {media_type}".encode())
+        return IconFile(path, digest, media_type)
+
+    async def read_body(self, response) -> bytes:
+        """分块读取响应，超过 max_size 时不再继续下载"""
+        if int(response.headers.get("content-length") or 0) > self.max_size:
+            raise IconFetchError(str(response.url))
+        chunks = []
+        size = 0
+        async for chunk in response.aiter_bytes():
+            size += len(chunk)
+            if size > self.max_size:
+                raise IconFetchError(str(response.url))
+            chunks.append(chunk)
+        return b"".join(chunks)
+
+    async def prefetch(self, urls: list[str], concurrency: int = 8) -> int:
+        """预先缓存一批图标
+        :return: 成功缓存的数量
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(url: str) -> bool:
+            async with semaphore:
+                try:
+                    await self.get(url)
+                    return True
+                except (IconNotAllowedError, IconFetchError):
+                    return False
+
+        return sum(await asyncio.gather(*(fetch(url) for url in set(urls))))
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+icon_cache = IconCache(
+    path=Path(config.icon.cache_path),
+    size=config.icon.size,
+    timeout=config.icon.timeout,
+    max_size=config.icon.max_size,
+)
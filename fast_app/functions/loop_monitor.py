@@ -0,0 +1,64 @@
+"""事件循环延迟监控
+
+后台任务每隔 interval 秒 sleep 一次，实际唤醒时间比预期晚的部分即为事件循环被阻塞的时间。
+"""
+
+import asyncio
+import logging
+from collections import deque
+from contextlib import suppress
+from typing import Optional
+
+from env import config
+
+logger = logging.getLogger(__name__)
+
+
+class LoopLagMonitor:
+    def __init__(self, interval: float, warning: float, window: int = 1200):
+        self.interval = interval
+        self.warning = warning
+        self.samples: deque[float] = deque(maxlen=window)
+        self.max = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="loop_lag_monitor")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(loop.time() - start - self.interval, 0.0)
+            self.samples.append(lag)
+            self.max = max(self.max, lag)
+            if lag > self.warning:
+                logger.warning("Event loop blocked for %.0fms", lag * 1000)
+
+    def stats(self) -> dict[str, float]:
+        """最近 window 次采样的延迟（毫秒）"""
+        samples = sorted(self.samples)
+        if not samples:
+            return {"samples": 0}
+        return {
+            "samples": len(samples),
+            "last_ms": self.samples[-1] * 1000,
+            "p50_ms": samples[len(samples) // 2] * 1000,
+            "p99_ms": samples[min(len(samples) * 99 // 100, len(samples) - 1)] * 1000,
+            "max_ms": self.max * 1000,
+        }
+
+
+loop_monitor = LoopLagMonitor(
+    interval=config.monitor.loop_lag_interval,
+    warning=config.monitor.loop_lag_warning,
+)
@@ -1,32 +1,144 @@
+import asyncio
+import hashlib
+import zlib
+from typing import AsyncIterator, Callable, Iterator
+
 import aiofiles
+import aiofiles.os
 import os
-from cashews import cache
 from fastapi import UploadFile
 from pathlib import Path
 
+from env import config
+from fast_app.functions.token_store import token_store
 from web_app.enums import Game
+from web_app.files import temp_file
+from web_app.games import get_gacha_log_functions
+from web_app.games.cache import history_cache, history_versions
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+class FileTooLargeError(Exception):
+    """上传文件超过大小限制"""
+
+
+class UnsupportedEncodingError(Exception):
+    """不支持的 Content-Encoding"""
+
+
+def normalize_encoding(encoding: str | None) -> str:
+    return (encoding or "identity").strip().lower()
+
+
+def get_decoder(encoding: str | None) -> Callable[[bytes], Iterator[bytes]]:
+    """根据 Content-Encoding 返回分块解压函数，传入空数据时输出剩余的缓冲数据
 
-DATA_PATH = Path("data") / "gacha_log"
-DATA_PATH.mkdir(exist_ok=True, parents=True)
+    zstd 不支持限制单次输出的大小，由 iter_zstd_file 按块读取
+    """
+    encoding = normalize_encoding(encoding)
+    chunk_size = config.pb.upload_chunk_size
+    if encoding == "identity":
+        return lambda data: iter((data,))
+    if encoding in ("gzip", "x-gzip"):
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+        def decode(data: bytes) -> Iterator[bytes]:
+            try:
+                if not data:
+                    yield decompressor.flush()
+                while data:
+                    yield decompressor.decompress(data, chunk_size)
+                    data = decompressor.unconsumed_tail
+            except zlib.error as exc:
+                raise ValueError("Invalid gzip data") from exc
+
+        return decode
+    raise UnsupportedEncodingError(encoding)
 
 
 class PBFunctions:
     @staticmethod
     async def save_file(file: UploadFile, uid: int, game: Game) -> None:
-        file_path = DATA_PATH / f"{game.value}" / f"{uid}.json"
-        file_path.parent.mkdir(exist_ok=True, parents=True)
-        async with aiofiles.open(file_path, "wb") as f:
-            await f.write(await file.read())
+        functions = get_gacha_log_functions(game)
+        file_path = functions.get_file_path(uid)
+        # 先分块写入临时文件再原子替换，避免读取到写了一半的文件，也避免整个文件读入内存
+        digest = hashlib.sha256()
+        size = 0
+        async with temp_file(file_path) as temp_path:
+            async with aiofiles.open(temp_path, "wb") as f:
+                async for data in PBFunctions.iter_file(file):
+                    size += len(data)
+                    if size > config.pb.max_upload_size:
+                        raise FileTooLargeError
+                    digest.update(data)
+                    await f.write(data)
+            if await PBFunctions.is_same_content(file_path, size, digest):
+                return
+            # 上传时校验一次，之后读取快照即可
+            stat = await aiofiles.os.stat(temp_path)
+            content = await functions.decode_history_file(temp_path, stat)
+            await aiofiles.os.replace(temp_path, file_path)
+        await functions.write_snapshot(file_path, content)
+        await history_versions.bump(game, uid)
+        history_cache.pop((game, uid))
+
+    @staticmethod
+    async def iter_file(file: UploadFile) -> AsyncIterator[bytes]:
+        encoding = normalize_encoding(file.headers.get("content-encoding"))
+        if encoding == "zstd" and zstandard is not None:
+            async for data in PBFunctions.iter_zstd_file(file):
+                yield data
+            return
+        decode = get_decoder(encoding)
+        while chunk := await file.read(config.pb.upload_chunk_size):
+            for data in decode(chunk):
+                yield data
+        for data in decode(b""):
+            yield data
+
+    @staticmethod
+    async def iter_zstd_file(file: UploadFile) -> AsyncIterator[bytes]:
+        """每次最多解压出 upload_chunk_size 字节，压缩率极高的数据也不会一次占用大量内存"""
+        chunk_size = config.pb.upload_chunk_size
+        await file.seek(0)
+        reader = zstandard.ZstdDecompressor().stream_reader(
+            file.file, read_size=chunk_size, read_across_frames=True, closefd=False
+        )
+        with reader:
+            while True:
+                try:
+                    data = await asyncio.to_thread(reader.read, chunk_size)
+                except zstandard.ZstdError as exc:
+                    raise ValueError("Invalid zstd data") from exc
+                if not data:
+                    break
+                yield data
+
+    @staticmethod
+    async def is_same_content(file_path: Path, size: int, digest) -> bool:
+        try:
+            if await aiofiles.os.path.getsize(file_path) != size:
+                return False
+            old_digest = hashlib.sha256()
+            async with aiofiles.open(file_path, "rb") as f:
+                while chunk := await f.read(config.pb.upload_chunk_size):
+                    old_digest.update(chunk)
+            return old_digest.digest() == digest.digest()
+        except FileNotFoundError:
+            return False
 
     @staticmethod
     async def create_hash(uid: int, game: Game) -> str:
         hash_str = os.urandom(16).hex()
-        await cache.set(hash_str, f"{game.value}_{uid}")
+        await token_store.set(hash_str, f"{game.value}_{uid}", config.token.ttl)
         return hash_str
 
     @staticmethod
     async def get_uid_by_hash(hash_str: str) -> tuple[Game, int]:
-        uid_str = await cache.get(hash_str)
+        uid_str = await token_store.get(hash_str)
         if not uid_str:
             raise FileNotFoundError
         game, uid = uid_str.split("_")
@@ -0,0 +1,171 @@
+"""account_id 到 (game, uid) 的映射存储
+
+- ``sqlite:///data/tokens.sqlite3``：本地 SQLite，重启后仍然有效，多个 worker 可共享同一文件
+- ``redis://...`` / ``mem://``：交给 cashews 处理，redis 可用于多机部署，需安装可选依赖 redis
+
+TokenStore 在进程内额外缓存一份读取结果，减少每次翻页都访问远程存储。
+"""
+
+import asyncio
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urlparse
+
+from cashews import Cache
+
+
+class BaseTokenStore(ABC):
+    @abstractmethod
+    async def get(self, token: str) -> Optional[str]:
+        pass
+
+    @abstractmethod
+    async def set(self, token: str, value: str, ttl: int) -> None:
+        """保存映射
+        :param ttl: 过期时间（秒），为 0 时不过期
+        """
+
+    async def sweep(self) -> int:
+        """批量清理已过期的映射，后端自带过期时无需处理
+        :return: 清理的数量
+        """
+        return 0
+
+    async def close(self) -> None:
+        pass
+
+
+class SQLiteTokenStore(BaseTokenStore):
+    def __init__(self, path: Path):
+        path.parent.mkdir(exist_ok=True, parents=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tokens ("
+            "token TEXT PRIMARY KEY, value TEXT NOT NULL, expire_at REAL"
+            ")"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS tokens_expire_at ON tokens (expire_at)")
+        self._conn.commit()
+
+    def _execute(self, sql: str, *args) -> int:
+        """执行语句
+        :return: 影响的行数
+        """
+        with self._lock, self._conn:
+            return self._conn.execute(sql, args).rowcount
+
+    def _fetchone(self, sql: str, *args) -> Optional[tuple]:
+        """查询一行，连接在线程间共享，读取结果也需要在锁内完成"""
+        with self._lock, self._conn:
+            return self._conn.execute(sql, args).fetchone()
+
+    async def get(self, token: str) -> Optional[str]:
+        row = await asyncio.to_thread(
+            self._fetchone,
+            "SELECT value FROM tokens WHERE token = ? AND (expire_at IS NULL OR expire_at > ?)",
+            token,
+            time.time(),
+        )
+        return row[0] if row else None
+
+    async def set(self, token: str, value: str, ttl: int) -> None:
+        expire_at = time.time() + ttl if ttl else None
+        await asyncio.to_thread(
+            self._execute,
+            "INSERT OR REPLACE INTO tokens (token, value, expire_at) VALUES (?, ?, ?)",
+            token,
+            value,
+            expire_at,
+        )
+
+    async def sweep(self) -> int:
+        return await asyncio.to_thread(
+            self._execute, "DELETE FROM tokens WHERE expire_at <= ?", time.time()
+        )
+
+    async def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class CashewsTokenStore(BaseTokenStore):
+    def __init__(self, url: str):
+        self._cache = Cache()
+        self._cache.setup(url)
+
+    async def get(self, token: str) -> Optional[str]:
+        return await self._cache.get(token)
+
+    async def set(self, token: str, value: str, ttl: int) -> None:
+        if not ttl:
+            # 内存后端在不指定 expire 时沿用已有键的过期时间，先删除再写入
+            await self._cache.delete(token)
+        await self._cache.set(token, value, expire=ttl or None)
+
+    async def close(self) -> None:
+        await self._cache.close()
+
+
+def create_token_store(url: str) -> BaseTokenStore:
+    parsed = urlparse(url)
+    if parsed.scheme == "sqlite":
+        # sqlite:///relative/path 与 sqlite:////absolute/path
+        return SQLiteTokenStore(Path(parsed.path[1:]))
+    return CashewsTokenStore(url)
+
+
+class TokenStore:
+    """带进程内读缓存的映射存储，需先调用 setup"""
+
+    def __init__(self, local_ttl: float = 60, local_max_size: int = 10000):
+        self.backend: Optional[BaseTokenStore] = None
+        self.local_ttl = local_ttl
+        self.local_max_size = local_max_size
+        self._local: OrderedDict[str, tuple[str, float]] = OrderedDict()
+
+    def setup(self, url: str, *, local_ttl: Optional[float] = None) -> None:
+        self.backend = create_token_store(url)
+        if local_ttl is not None:
+            self.local_ttl = local_ttl
+        self._local.clear()
+
+    async def get(self, token: str) -> Optional[str]:
+        local = self._local.get(token)
+        if local is not None and local[1] > time.monotonic():
+            self._local.move_to_end(token)
+            return local[0]
+        value = await self.backend.get(token)
+        if value is None:
+            self._local.pop(token, None)
+        else:
+            self._cache_local(token, value)
+        return value
+
+    async def set(self, token: str, value: str, ttl: int) -> None:
+        await self.backend.set(token, value, ttl)
+        self._cache_local(token, value)
+
+    async def sweep(self) -> int:
+        return await self.backend.sweep()
+
+    async def close(self) -> None:
+        if self.backend is not None:
+            await self.backend.close()
+
+    def _cache_local(self, token: str, value: str) -> None:
+        if not self.local_ttl:
+            return
+        self._local[token] = (value, time.monotonic() + self.local_ttl)
+        self._local.move_to_end(token)
+        while len(self._local) > self.local_max_size:
+            self._local.popitem(last=False)
+
+
+token_store = TokenStore()
@@ -0,0 +1,21 @@
+from starlette.responses import PlainTextResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+
+class UploadSizeLimitMiddleware:
+    """根据 Content-Length 提前拒绝过大的上传请求，避免先把请求体解析到临时文件"""
+
+    def __init__(self, app: ASGIApp, *, path: str, max_size: int) -> None:
+        self.app = app
+        self.path = path
+        self.max_size = max_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and scope["path"] == self.path:
+            content_length = dict(scope["headers"]).get(b"content-length")
+            if content_length and content_length.isdigit():
+                if int(content_length) > self.max_size:
+                    response = PlainTextResponse("File too large", status_code=413)
+                    await response(scope, receive, send)
+                    return
+        await self.app(scope, receive, send)
@@ -1,26 +1,51 @@
-import flet.fastapi as flet_fastapi
-from cashews import cache
-from pathlib import Path
+from functools import cache
 from logging import basicConfig, INFO
+from pathlib import Path
 
 from env import config
-from fast_app.app import app
-from web_app.main import web_app_entry
 
-basicConfig(level=INFO)
-cache.setup("mem://")
 ASSETS_PATH = Path(__file__).parent / "web_app" / "assets"
-app.mount(
-    "/",
-    flet_fastapi.app(
-        web_app_entry,
-        assets_dir=str(ASSETS_PATH),
-        use_color_emoji=True,
-    ),
-)
+
+
+@cache
+def create_app():
+    """组装 API 与 Flet 页面
+
+    解码进程池以 spawn 启动子进程，子进程会重新导入本模块，因此导入时不创建应用、不导入 flet，
+    只在取用 main.app 或直接运行时才组装。token 存储等资源在 lifespan 中打开。
+    """
+    import flet.fastapi as flet_fastapi
+
+    from fast_app.app import app
+    from web_app.main import web_app_entry
+
+    basicConfig(level=INFO)
+    app.mount(
+        "/",
+        flet_fastapi.app(
+            web_app_entry,
+            assets_dir=str(ASSETS_PATH),
+            use_color_emoji=True,
+        ),
+    )
+    return app
+
+
+def __getattr__(name: str):
+    # uvicorn main:app 按属性取用应用
+    if name == "app":
+        return create_app()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 if __name__ == "__main__":
     import uvicorn
 
-    uvicorn.run(app, host=config.web.host, port=config.web.port)
+    if config.web.workers > 1:
+        if config.token.url.startswith("mem://"):
+            raise ValueError("多 worker 模式下 token 存储需要在进程间共享，请使用 sqlite 或 redis")
+        uvicorn.run(
+            "main:app", host=config.web.host, port=config.web.port, workers=config.web.workers
+        )
+    else:
+        uvicorn.run(create_app(), host=config.web.host, port=config.web.port)
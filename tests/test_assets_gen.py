@@ -0,0 +1,186 @@
+import asyncio
+import copy
+import hashlib
+import os
+
+import pytest
+import ujson
+from httpx import AsyncClient, MockTransport, Request, Response
+
+from assets.gen import (
+    ASSETS_GS_PATH,
+    ASSETS_HSR_PATH,
+    ASSETS_MC_PATH,
+    ASSETS_PATH,
+    ASSETS_ZZZ_PATH,
+    AssetsGen,
+)
+
+YATTA_URL = "http://yatta.test"
+HAKUSH_URL = "http://hakush.test"
+ASSETS_FILES = (ASSETS_GS_PATH, ASSETS_HSR_PATH, ASSETS_ZZZ_PATH, ASSETS_MC_PATH)
+
+DATA = {
+    "/api/v2/chs/avatar": {"data": {"items": {"1": {"name": "甘雨", "icon": "UI_AvatarIcon_Ganyu"}}}},
+    "/api/v2/chs/weapon": {"data": {"items": {"2": {"name": "阿莫斯之弓", "icon": "UI_EquipIcon_Bow_Amos"}}}},
+    "/hsr/data/character.json": {"1001": {"cn": "三月七"}},
+    "/hsr/data/lightcone.json": {"20000": {"cn": "锋镝"}},
+    "/zzz/data/character.json": {"1011": {"CHS": "安比"}},
+    "/zzz/data/weapon.json": {"12001": {"CHS": "「月相」-望"}},
+    "/zzz/data/bangboo.json": {"53001": {"CHS": "企鹅布"}},
+    "/ww/data/character.json": {"1": {"zh-Hans": "今汐", "icon": "/Game/Aki/UI/a.png"}},
+    "/ww/data/weapon.json": {"2": {"zh-Hans": "刀", "icon": "/Game/Aki/UI/b.png"}},
+}
+
+
+class Upstream:
+    """模拟数据源，支持 ETag 条件请求，记录并发数和响应状态"""
+
+    def __init__(self, etag: bool = True, concurrency: int = 8):
+        self.data = copy.deepcopy(DATA)
+        self.etag = etag
+        self.concurrency = concurrency
+        self.failed: set[str] = set()
+        self.statuses: list[int] = []
+        self.active = 0
+        self.max_active = 0
+
+    async def handle(self, request: Request) -> Response:
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(0.01)
+            response = self.respond(request)
+        finally:
+            self.active -= 1
+        self.statuses.append(response.status_code)
+        return response
+
+    def respond(self, request: Request) -> Response:
+        path = request.url.path
+        if path in self.failed:
+            return Response(500)
+        body = ujson.dumps(self.data[path]).encode()
+        if not self.etag:
+            return Response(200, content=body)
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        if request.headers.get("if-none-match") == etag:
+            return Response(304, headers={"ETag": etag})
+        return Response(200, content=body, headers={"ETag": etag})
+
+    def run(self) -> list:
+        async def main():
+            client = AsyncClient(transport=MockTransport(self.handle))
+            gen = AssetsGen(
+                yatta_url=YATTA_URL,
+                hakush_url=HAKUSH_URL,
+                concurrency=self.concurrency,
+                client=client,
+            )
+            async with client:
+                return await gen.main()
+
+        self.statuses.clear()
+        return asyncio.run(main())
+
+
+@pytest.fixture(autouse=True)
+def assets_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / ASSETS_PATH).mkdir()
+
+
+def read_assets(path) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return ujson.load(f)
+
+
+def get_mtimes() -> dict:
+    return {path: os.stat(path).st_mtime_ns for path in ASSETS_FILES}
+
+
+def test_generate():
+    upstream = Upstream()
+    assert sorted(upstream.run()) == sorted(ASSETS_FILES)
+    assert upstream.statuses == [200] * len(DATA)
+    assert read_assets(ASSETS_GS_PATH)["甘雨"] == f"{YATTA_URL}/assets/UI/UI_AvatarIcon_Ganyu.png"
+    assert read_assets(ASSETS_MC_PATH)["今汐"] == f"{HAKUSH_URL}/ww/UI/a.webp"
+    zzz = read_assets(ASSETS_ZZZ_PATH)
+    assert zzz["安比"] == zzz["1011"]
+    assert {"1011", "12001", "53001", "hash"} <= zzz.keys()
+
+
+@pytest.mark.parametrize("concurrency", [1, 3])
+def test_fetch_concurrently(concurrency):
+    upstream = Upstream(concurrency=concurrency)
+    upstream.run()
+    assert upstream.max_active == concurrency
+    assert upstream.statuses == [200] * len(DATA)
+
+
+def test_not_modified_reuses_cached_data():
+    upstream = Upstream()
+    upstream.run()
+    contents = {path: read_assets(path) for path in ASSETS_FILES}
+    mtimes = get_mtimes()
+
+    assert upstream.run() == []
+    assert upstream.statuses == [304] * len(DATA)
+    assert {path: read_assets(path) for path in ASSETS_FILES} == contents
+    assert get_mtimes() == mtimes
+
+
+def test_unchanged_content_not_rewritten():
+    upstream = Upstream(etag=False)
+    upstream.run()
+    hashes = {path: read_assets(path)["hash"] for path in ASSETS_FILES}
+    mtimes = get_mtimes()
+
+    assert upstream.run() == []
+    assert upstream.statuses == [200] * len(DATA)
+    assert {path: read_assets(path)["hash"] for path in ASSETS_FILES} == hashes
+    assert get_mtimes() == mtimes
+
+    upstream.data["/zzz/data/bangboo.json"]["53002"] = {"CHS": "鲨牙布"}
+    assert upstream.run() == [ASSETS_ZZZ_PATH]
+    assert read_assets(ASSETS_ZZZ_PATH)["hash"] != hashes[ASSETS_ZZZ_PATH]
+    assert "鲨牙布" in read_assets(ASSETS_ZZZ_PATH)
+    assert {path: read_assets(path)["hash"] for path in ASSETS_FILES if path != ASSETS_ZZZ_PATH} == {
+        path: value for path, value in hashes.items() if path != ASSETS_ZZZ_PATH
+    }
+
+
+def test_failed_source_keeps_old_file():
+    upstream = Upstream()
+    upstream.run()
+    old = read_assets(ASSETS_ZZZ_PATH)
+
+    # 同一文件的其他数据源有更新，但只要一个数据源失败就不写入，避免丢失图标
+    upstream.failed.add("/zzz/data/weapon.json")
+    upstream.data["/zzz/data/bangboo.json"]["53002"] = {"CHS": "鲨牙布"}
+    upstream.data["/hsr/data/character.json"]["1002"] = {"cn": "丹恒"}
+    assert upstream.run() == [ASSETS_HSR_PATH]
+    assert read_assets(ASSETS_ZZZ_PATH) == old
+    assert "丹恒" in read_assets(ASSETS_HSR_PATH)
+
+    upstream.failed.clear()
+    assert upstream.run() == [ASSETS_ZZZ_PATH]
+    assert {"鲨牙布", "「月相」-望"} <= read_assets(ASSETS_ZZZ_PATH).keys()
+
+
+def test_failed_write_leaves_no_temp_file(monkeypatch):
+    upstream = Upstream()
+    upstream.run()
+    old = read_assets(ASSETS_ZZZ_PATH)
+
+    async def replace(*args):
+        raise OSError("disk full")
+
+    monkeypatch.setattr("aiofiles.os.replace", replace)
+    upstream.data["/zzz/data/bangboo.json"]["53002"] = {"CHS": "鲨牙布"}
+    with pytest.raises(OSError):
+        upstream.run()
+    assert read_assets(ASSETS_ZZZ_PATH) == old
+    assert sorted(i.name for i in ASSETS_PATH.iterdir()) == sorted(
+        [".http_cache.json", *(i.name for i in ASSETS_FILES)]
+    )
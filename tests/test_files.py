@@ -0,0 +1,40 @@
+import asyncio
+
+import pytest
+
+from web_app.files import atomic_write, temp_file
+
+
+def test_atomic_write(tmp_path):
+    path = tmp_path / "a" / "b.json"
+    asyncio.run(atomic_write(path, b"1"))
+    asyncio.run(atomic_write(path, b"2"))
+    assert path.read_bytes() == b"2"
+    assert [i.name for i in path.parent.iterdir()] == ["b.json"]
+
+
+def test_temp_file_removed_on_error(tmp_path):
+    path = tmp_path / "b.json"
+    path.write_bytes(b"old")
+
+    async def main():
+        async with temp_file(path) as temp_path:
+            temp_path.write_bytes(b"new")
+            raise ValueError
+
+    with pytest.raises(ValueError):
+        asyncio.run(main())
+    assert path.read_bytes() == b"old"
+    assert [i.name for i in tmp_path.iterdir()] == ["b.json"]
+
+
+def test_temp_file_names_unique(tmp_path):
+    path = tmp_path / "b.json"
+
+    async def main():
+        async with temp_file(path) as first, temp_file(path) as second:
+            return first, second
+
+    first, second = asyncio.run(main())
+    assert first != second
+    assert first.parent == second.parent == tmp_path
@@ -0,0 +1,148 @@
+import asyncio
+import random
+
+import pytest
+
+from benchmarks.utils import make_history
+from web_app.enums import Game
+from web_app.games import get_gacha_log_functions
+from web_app.games.columns import GachaLogColumns
+from web_app.games.genshin import GachaLogInfo
+from web_app.games.index import BannerIndex
+from web_app.games.search import get_initials, normalize
+from web_app.schema import GachaParams
+
+BANNER = "角色祈愿"
+QUERIES = [
+    (None, []),
+    (None, [5]),
+    (None, [4, 5]),
+    (None, [3, 4, 5]),
+    ("香菱", []),
+    ("香菱", [4]),
+    ("香菱", [5]),
+    ("香菱", [4, 5]),
+    ("迪", []),
+    ("迪", [5]),
+    ("之", [3]),
+    ("ＬＤＪＪ", []),
+    ("xl", [4, 5]),
+    ("不存在", []),
+    ("  ", [4]),
+]
+
+
+def make_history_info() -> GachaLogColumns:
+    history = make_history(1, 3000)
+    # 同名物品出现不同星级，覆盖需要逐条筛选星级的分组
+    for item in history["item_list"][BANNER][::97]:
+        if item["name"] == "香菱":
+            item["rank_type"] = 5
+    return GachaLogColumns.from_info(GachaLogInfo.model_validate(history))
+
+
+def scan(items, query: str | None, rarities: list[int]) -> list[int]:
+    """逐条倒序扫描，作为筛选结果的参照"""
+    query = normalize(query or "")
+    positions = []
+    for position in reversed(range(len(items))):
+        item = items[position]
+        if rarities and item.rank_type not in rarities:
+            continue
+        if query and query not in normalize(item.name) and query not in get_initials(item.name):
+            continue
+        positions.append(position)
+    return positions
+
+
+def scan_pities(ranks) -> list[int]:
+    pities = []
+    for position, rank in enumerate(ranks):
+        previous = position - 1
+        while previous >= 0 and ranks[previous] < rank:
+            previous -= 1
+        pities.append(position - previous)
+    return pities
+
+
+@pytest.fixture(scope="module")
+def history_info():
+    return make_history_info()
+
+
+@pytest.fixture
+def functions(history_info, monkeypatch):
+    functions = get_gacha_log_functions(Game.GENSHIN)
+
+    async def get_history_info(uid: int) -> GachaLogColumns:
+        return history_info
+
+    monkeypatch.setattr(functions, "get_history_info", get_history_info)
+    return functions
+
+
+def get_slice(functions, query, rarities, offset, limit):
+    params = GachaParams(
+        account_id="test", uid=1, banner_type=BANNER, rarities=rarities, name_contains=query
+    )
+    return asyncio.run(functions.get_gacha_logs_slice(params, offset, limit))
+
+
+@pytest.mark.parametrize("query, rarities", QUERIES)
+def test_slice_matches_scan(functions, history_info, query, rarities):
+    items = history_info.item_list[BANNER]
+    expected = scan(items, query, rarities)
+    pities = scan_pities([item.rank_type for item in items])
+    for offset, limit in ((0, 100), (100, 100), (len(expected) - 7, 50), (len(expected) + 10, 20)):
+        offset = max(offset, 0)
+        entries, total = get_slice(functions, query, rarities, offset, limit)
+        assert total == len(expected)
+        assert [i.position for i in entries] == expected[offset : offset + limit]
+        assert [i.item.id for i in entries] == [items[i].id for i in expected[offset : offset + limit]]
+        assert [i.pity for i in entries] == [pities[i] for i in expected[offset : offset + limit]]
+
+
+def test_merged_results_memoized(functions, history_info):
+    index = history_info.item_list[BANNER].index
+    index.results.clear()
+    index.results_nbytes = 0
+    # 单个分组直接切片，不缓存
+    get_slice(functions, None, [5], 0, 10)
+    get_slice(functions, "香菱", [4], 0, 10)
+    assert not index.results
+    # 多个分组归并后缓存，翻页时复用
+    first, total = get_slice(functions, None, [4, 5], 0, 10)
+    assert len(index.results) == 1
+    merged = next(iter(index.results.values()))
+    second, _ = get_slice(functions, None, [4, 5], 10, 10)
+    assert next(iter(index.results.values())) is merged
+    assert [i.position for i in first + second] == merged[:20].tolist()
+    assert len(merged) == total
+    assert index.results_nbytes == len(merged) * merged.itemsize
+
+
+def test_search_random_substrings(functions, history_info):
+    items = history_info.item_list[BANNER]
+    names = sorted(set(items.index.names))
+    rnd = random.Random(0)
+    for _ in range(200):
+        name = rnd.choice(names)
+        start = rnd.randrange(len(name))
+        query = name[start : rnd.randint(start + 1, len(name))]
+        rarities = rnd.choice([[], [3], [4], [5], [4, 5]])
+        entries, total = get_slice(functions, query, rarities, 0, 30)
+        expected = scan(items, query, rarities)
+        assert total == len(expected)
+        assert [i.position for i in entries] == expected[:30]
+
+
+def test_empty_banner(functions):
+    params = GachaParams(account_id="test", uid=1, banner_type="新手祈愿")
+    assert asyncio.run(functions.get_gacha_logs_slice(params, 0, 10)) == ([], 0)
+
+
+def test_build_pities():
+    rnd = random.Random(0)
+    for _ in range(200):
+        ranks = [rnd.choice((3, 3, 3, 4, 5)) for _ in range(rnd.randint(0, 200))]
+        assert BannerIndex.build_pities(ranks).tolist() == scan_pities(ranks)
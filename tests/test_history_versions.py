@@ -0,0 +1,41 @@
+import asyncio
+import os
+
+import pytest
+
+from web_app.enums import Game
+from web_app.games import get_gacha_log_functions
+from web_app.games.cache import HistoryVersions, get_history_file_path
+
+
+@pytest.fixture
+def gacha_log_path(tmp_path, monkeypatch):
+    functions = get_gacha_log_functions(Game.GENSHIN)
+    monkeypatch.setattr(functions, "gacha_log_path", tmp_path)
+    return tmp_path
+
+
+def test_follows_gacha_log_path(gacha_log_path):
+    assert get_history_file_path(Game.GENSHIN, 1) == gacha_log_path / "1.json"
+
+
+def test_version_changes_on_replace(gacha_log_path):
+    versions = HistoryVersions(get_history_file_path, check_interval=60)
+    path = gacha_log_path / "1.json"
+
+    async def main():
+        assert await versions.get(Game.GENSHIN, 1) == ""
+        path.write_text("{}")
+        # 检查间隔内沿用缓存的版本，bump 后立即刷新
+        assert await versions.get(Game.GENSHIN, 1) == ""
+        version = await versions.bump(Game.GENSHIN, 1)
+        assert version
+        assert await versions.get(Game.GENSHIN, 1) == version
+
+        temp_path = gacha_log_path / ".1.json.tmp"
+        temp_path.write_text('{"uid": "1"}')
+        os.replace(temp_path, path)
+        new_version = await versions.bump(Game.GENSHIN, 1)
+        assert new_version and new_version != version
+
+    asyncio.run(main())
@@ -0,0 +1,150 @@
+import struct
+import threading
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from env import config
+from fast_app.endpoints import icons as icons_endpoint
+from fast_app.functions.icons import IconCache
+
+
+def make_png() -> bytes:
+    """1x1 的 PNG 图片"""
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    header = struct.pack(">IIBBBBB", 1, 1, 8, 2, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", header)
+        + chunk(b"IDAT", zlib.compress(b"\x00\xff\x00\x00"))
+        + chunk(b"IEND", b"")
+    )
+
+
+PNG = make_png()
+MAX_SIZE = 4096
+
+
+class UpstreamHandler(BaseHTTPRequestHandler):
+    requests: list[str]
+
+    def do_GET(self):
+        self.requests.append(self.path)
+        if self.path == "/icon.png":
+            self.send_response(200)
+            self.send_header("Content-Type", "image/png")
+            self.end_headers()
+            self.wfile.write(PNG)
+        elif self.path == "/redirect":
+            # localhost 不在允许的域名内
+            self.send_response(302)
+            self.send_header("Location", f"http://localhost:{self.server.server_port}/icon.png")
+            self.end_headers()
+        elif self.path in ("/large", "/large-unsized"):
+            self.send_response(200)
+            self.send_header("Content-Type", "image/png")
+            if self.path == "/large":
+                self.send_header("Content-Length", str(len(PNG) + MAX_SIZE))
+            self.end_headers()
+            self.wfile.write(PNG + b"\0" * MAX_SIZE)
+        elif self.path == "/page":
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.end_headers()
+            self.wfile.write(b"<html></html>")
+        else:
+            self.send_response(500)
+            self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def upstream():
+    handler = type("Handler", (UpstreamHandler,), {"requests": []})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}", handler.requests
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(config.icon, "proxy", True)
+    monkeypatch.setattr(config.icon, "allowed_hosts", ["127.0.0.1"])
+    cache = IconCache(path=tmp_path, size=config.icon.size, timeout=5, max_size=MAX_SIZE)
+    monkeypatch.setattr(icons_endpoint, "icon_cache", cache)
+    app = FastAPI()
+    app.include_router(icons_endpoint.router)
+    with TestClient(app) as client:
+        yield client
+        client.portal.call(cache.close)
+
+
+def test_icon_cached(client, upstream):
+    base_url, requests = upstream
+    response = client.get("/api/icon", params={"url": f"{base_url}/icon.png"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("image/")
+    etag = response.headers["etag"]
+
+    response = client.get("/api/icon", params={"url": f"{base_url}/icon.png"})
+    assert response.status_code == 200
+    assert response.headers["etag"] == etag
+    assert requests == ["/icon.png"]
+
+
+def test_icon_not_modified(client, upstream):
+    base_url, _ = upstream
+    url = f"{base_url}/icon.png"
+    etag = client.get("/api/icon", params={"url": url}).headers["etag"]
+    response = client.get("/api/icon", params={"url": url}, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert not response.content
+
+
+def test_icon_host_not_allowed(client, upstream):
+    assert client.get("/api/icon", params={"url": "http://10.0.0.1/icon.png"}).status_code == 403
+
+
+def test_icon_redirect_not_allowed(client, upstream):
+    base_url, requests = upstream
+    assert client.get("/api/icon", params={"url": f"{base_url}/redirect"}).status_code == 403
+    assert requests == ["/redirect"]
+
+
+@pytest.mark.parametrize("path", ["/error", "/page"])
+def test_icon_fetch_failed(client, upstream, path):
+    base_url, _ = upstream
+    assert client.get("/api/icon", params={"url": f"{base_url}{path}"}).status_code == 502
+
+
+def test_icon_proxy_disabled(client, upstream, monkeypatch):
+    base_url, requests = upstream
+    monkeypatch.setattr(config.icon, "proxy", False)
+    assert client.get("/api/icon", params={"url": f"{base_url}/icon.png"}).status_code == 404
+    assert requests == []
+
+
+@pytest.mark.parametrize("path", ["/large", "/large-unsized"])
+def test_icon_too_large(client, upstream, path):
+    base_url, _ = upstream
+    assert client.get("/api/icon", params={"url": f"{base_url}{path}"}).status_code == 502
+
+
+def test_icon_decompression_bomb(client, upstream, monkeypatch):
+    image = pytest.importorskip("PIL.Image")
+    base_url, _ = upstream
+    # 1x1 的图片也超过上限，Pillow 抛出 DecompressionBombError
+    monkeypatch.setattr(image, "MAX_IMAGE_PIXELS", 0)
+    assert client.get("/api/icon", params={"url": f"{base_url}/icon.png"}).status_code == 502
@@ -0,0 +1,127 @@
+import os
+from typing import Dict, List
+
+import pytest
+import ujson
+
+from benchmarks.utils import make_history
+from web_app.games.base import BaseGachaItem, BaseGachaLogInfo
+from web_app.games.columns import GachaLogColumns
+from web_app.games.genshin import GachaLogInfo
+from web_app.games.snapshot import dump_snapshot, load_snapshot
+
+
+class OtherGachaItem(BaseGachaItem):
+    item_id: str
+
+
+class OtherGachaLogInfo(BaseGachaLogInfo):
+    item_list: Dict[str, List[OtherGachaItem]]
+
+
+def write_history(path, history: dict) -> os.stat_result:
+    with open(path, "w", encoding="utf-8") as f:
+        ujson.dump(history, f, ensure_ascii=False)
+    return os.stat(path)
+
+
+@pytest.fixture
+def history_file(tmp_path):
+    history = make_history(1, 600)
+    path = tmp_path / "1.json"
+    return history, path, write_history(path, history)
+
+
+def dump(history: dict, stat: os.stat_result) -> tuple[GachaLogColumns, bytes]:
+    history_info = GachaLogColumns.from_info(GachaLogInfo.model_validate(history))
+    return history_info, dump_snapshot(history_info, stat)
+
+
+def get_index_arrays(columns) -> dict:
+    index = columns.index
+    return {
+        "length": index.length,
+        "ranks": list(index.ranks),
+        "names": list(index.names),
+        "rarity_positions": {k: list(v) for k, v in index.rarity_positions.items()},
+        "name_positions": [list(i) for i in index.name_positions],
+        "name_ranks": list(index.name_ranks),
+        "pities": list(index.pities),
+    }
+
+
+def test_round_trip(history_file):
+    history, _, stat = history_file
+    history_info, content = dump(history, stat)
+    loaded = load_snapshot(content, GachaLogInfo, stat)
+    assert loaded is not None
+    assert (loaded.user_id, loaded.uid, loaded.update_time) == (
+        history_info.user_id,
+        history_info.uid,
+        history_info.update_time,
+    )
+    assert list(loaded.item_list) == list(history_info.item_list)
+    for banner, columns in history_info.item_list.items():
+        loaded_columns = loaded.item_list[banner]
+        assert len(loaded_columns) == len(columns) == len(history["item_list"][banner])
+        assert [i.model_dump() for i in loaded_columns] == [i.model_dump() for i in columns]
+        assert get_index_arrays(loaded_columns) == get_index_arrays(columns)
+
+
+def test_round_trip_empty_banners(tmp_path):
+    history = make_history(1, 0)
+    stat = write_history(tmp_path / "1.json", history)
+    _, content = dump(history, stat)
+    loaded = load_snapshot(content, GachaLogInfo, stat)
+    assert loaded is not None
+    for banner in history["item_list"]:
+        columns = loaded.item_list[banner]
+        assert len(columns) == 0
+        assert list(columns) == []
+        assert get_index_arrays(columns)["pities"] == []
+
+
+def test_load_banners_lazily(history_file):
+    history, _, stat = history_file
+    _, content = dump(history, stat)
+    loaded = load_snapshot(content, GachaLogInfo, stat)
+    assert not loaded.item_list.loaded
+    loaded.item_list["武器祈愿"]
+    assert list(loaded.item_list.loaded) == ["武器祈愿"]
+
+
+def test_stale_source(history_file):
+    history, path, stat = history_file
+    _, content = dump(history, stat)
+    history["uid"] = "10"
+    new_stat = write_history(path, history)
+    assert new_stat.st_size != stat.st_size
+    assert load_snapshot(content, GachaLogInfo, new_stat) is None
+
+    history["uid"] = "1"
+    stat = write_history(path, history)
+    _, content = dump(history, stat)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    new_stat = os.stat(path)
+    assert new_stat.st_size == stat.st_size
+    assert load_snapshot(content, GachaLogInfo, new_stat) is None
+
+
+def test_field_mismatch(history_file):
+    history, _, stat = history_file
+    _, content = dump(history, stat)
+    assert load_snapshot(content, OtherGachaLogInfo, stat) is None
+
+
+@pytest.mark.parametrize("size", [8, 24, 40, 200])
+def test_truncated_header(history_file, size):
+    history, _, stat = history_file
+    _, content = dump(history, stat)
+    assert load_snapshot(content[:size], GachaLogInfo, stat) is None
+
+
+def test_truncated_data(history_file):
+    history, _, stat = history_file
+    _, content = dump(history, stat)
+    assert load_snapshot(content[:-1], GachaLogInfo, stat) is None
+    assert load_snapshot(content[: len(content) // 2], GachaLogInfo, stat) is None
@@ -0,0 +1,56 @@
+import datetime
+
+from web_app.enums import Game
+from web_app.games.columns import GachaLogColumns
+from web_app.games.genshin import GachaLogInfo
+from web_app.games.stats import get_banner_stats
+
+BANNER = "角色祈愿"
+
+
+def make_columns(pulls: list[tuple[str, int, datetime.datetime]]):
+    items = [
+        {
+            "id": str(1000 + i),
+            "name": name,
+            "gacha_type": "301",
+            "item_type": "角色",
+            "rank_type": rank,
+            "time": time,
+        }
+        for i, (name, rank, time) in enumerate(pulls)
+    ]
+    history = {
+        "user_id": "1",
+        "uid": "1",
+        "update_time": datetime.datetime(2024, 1, 1),
+        "item_list": {BANNER: items},
+    }
+    return GachaLogColumns.from_info(GachaLogInfo.model_validate(history)).item_list[BANNER]
+
+
+def test_rate_up_before_joining_standard():
+    # 提纳里 3.6 版本才加入常驻，此前在自己的 UP 池中抽到不算歪
+    before = datetime.datetime(2022, 8, 24, 12)
+    after = datetime.datetime(2023, 5, 1, 12)
+    columns = make_columns(
+        [
+            ("香菱", 4, before),
+            ("提纳里", 5, before),
+            ("纳西妲", 5, before),
+            ("提纳里", 5, after),
+            ("雷电将军", 5, after),
+            ("七七", 5, after),
+        ]
+    )
+    stats = get_banner_stats(Game.GENSHIN, BANNER, columns)
+    assert (stats.wins, stats.losses, stats.guaranteed) == (2, 2, True)
+    assert stats.top_count == 5
+    assert stats.pity == 0
+
+
+def test_standard_from_launch():
+    time = datetime.datetime(2021, 1, 1)
+    columns = make_columns([("刻晴", 5, time), ("胡桃", 5, time), ("胡桃", 5, time)])
+    stats = get_banner_stats(Game.GENSHIN, BANNER, columns)
+    assert (stats.wins, stats.losses, stats.guaranteed) == (1, 1, False)
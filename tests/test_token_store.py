@@ -0,0 +1,197 @@
+import asyncio
+import time
+from typing import Optional
+
+import pytest
+from cashews.backends import memory as cashews_memory
+
+from fast_app.functions import token_store as token_store_module
+from fast_app.functions.token_store import (
+    BaseTokenStore,
+    CashewsTokenStore,
+    SQLiteTokenStore,
+    TokenStore,
+    create_token_store,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = time.time()
+
+    def time(self) -> float:
+        return self.now
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+class FakeTokenStore(BaseTokenStore):
+    """内存后端，记录读取次数"""
+
+    def __init__(self):
+        self.data: dict[str, str] = {}
+        self.reads = 0
+
+    async def get(self, token: str) -> Optional[str]:
+        self.reads += 1
+        return self.data.get(token)
+
+    async def set(self, token: str, value: str, ttl: int) -> None:
+        self.data[token] = value
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(token_store_module, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def sqlite_store(tmp_path):
+    store = SQLiteTokenStore(tmp_path / "tokens.sqlite3")
+    yield store
+    asyncio.run(store.close())
+
+
+def test_create_token_store(tmp_path):
+    store = create_token_store(f"sqlite:///{tmp_path}/tokens.sqlite3")
+    assert isinstance(store, SQLiteTokenStore)
+    asyncio.run(store.close())
+    assert isinstance(create_token_store("mem://"), CashewsTokenStore)
+
+
+def test_sqlite_ttl(sqlite_store, clock):
+    async def main():
+        await sqlite_store.set("a", "genshin_1", 10)
+        await sqlite_store.set("b", "genshin_2", 0)
+        assert await sqlite_store.get("a") == "genshin_1"
+        clock.now += 20
+        assert await sqlite_store.get("a") is None
+        assert await sqlite_store.get("b") == "genshin_2"
+        assert await sqlite_store.get("c") is None
+
+    asyncio.run(main())
+
+
+def test_sqlite_sweep(sqlite_store, clock):
+    async def main():
+        for i in range(3):
+            await sqlite_store.set(f"expired{i}", "genshin_1", 10)
+        await sqlite_store.set("alive", "genshin_2", 100)
+        await sqlite_store.set("forever", "genshin_3", 0)
+        assert await sqlite_store.sweep() == 0
+        clock.now += 20
+        assert await sqlite_store.sweep() == 3
+        assert await sqlite_store.sweep() == 0
+        assert await sqlite_store.get("alive") == "genshin_2"
+        assert await sqlite_store.get("forever") == "genshin_3"
+
+    asyncio.run(main())
+
+
+def test_sqlite_concurrent(sqlite_store):
+    async def main():
+        await asyncio.gather(*(sqlite_store.set(str(i), f"genshin_{i}", 0) for i in range(50)))
+        values = await asyncio.gather(*(sqlite_store.get(str(i)) for i in range(50)))
+        assert values == [f"genshin_{i}" for i in range(50)]
+
+    asyncio.run(main())
+
+
+def test_sqlite_persist(tmp_path):
+    async def main():
+        store = SQLiteTokenStore(tmp_path / "tokens.sqlite3")
+        await store.set("a", "genshin_1", 0)
+        await store.close()
+        store = SQLiteTokenStore(tmp_path / "tokens.sqlite3")
+        assert await store.get("a") == "genshin_1"
+        await store.close()
+
+    asyncio.run(main())
+
+
+@pytest.fixture
+def cashews_store(clock, monkeypatch):
+    monkeypatch.setattr(cashews_memory, "time", clock)
+    return CashewsTokenStore("mem://")
+
+
+def test_cashews_ttl(cashews_store, clock):
+    async def main():
+        await cashews_store.set("a", "genshin_1", 10)
+        await cashews_store.set("b", "genshin_2", 0)
+        await cashews_store.set("c", "genshin_3", 10)
+        # 有过期时间的映射改为永不过期
+        await cashews_store.set("c", "genshin_4", 0)
+        assert await cashews_store.get("a") == "genshin_1"
+        clock.now += 20
+        assert await cashews_store.get("a") is None
+        assert await cashews_store.get("b") == "genshin_2"
+        assert await cashews_store.get("c") == "genshin_4"
+        assert await cashews_store.get("d") is None
+        await cashews_store.close()
+
+    asyncio.run(main())
+
+
+def test_local_read_through(clock):
+    store = TokenStore(local_ttl=60)
+    store.backend = backend = FakeTokenStore()
+    backend.data["a"] = "genshin_1"
+
+    async def main():
+        assert await store.get("a") == "genshin_1"
+        assert await store.get("a") == "genshin_1"
+        assert backend.reads == 1
+        clock.now += 61
+        assert await store.get("a") == "genshin_1"
+        assert backend.reads == 2
+
+    asyncio.run(main())
+
+
+def test_local_cache_on_set(clock):
+    store = TokenStore(local_ttl=60)
+    store.backend = backend = FakeTokenStore()
+
+    async def main():
+        await store.set("a", "genshin_1", 10)
+        assert await store.get("a") == "genshin_1"
+        assert backend.reads == 0
+        # 不存在的映射不缓存，之后创建的映射可以立即读到
+        assert await store.get("b") is None
+        backend.data["b"] = "genshin_2"
+        assert await store.get("b") == "genshin_2"
+        assert backend.reads == 2
+
+    asyncio.run(main())
+
+
+def test_local_cache_max_size(clock):
+    store = TokenStore(local_ttl=60, local_max_size=2)
+    store.backend = backend = FakeTokenStore()
+
+    async def main():
+        for token in "abc":
+            await store.set(token, f"genshin_{token}", 0)
+        assert await store.get("c") == "genshin_c"
+        assert backend.reads == 0
+        assert await store.get("a") == "genshin_a"
+        assert backend.reads == 1
+
+    asyncio.run(main())
+
+
+def test_local_cache_disabled(clock):
+    store = TokenStore(local_ttl=0)
+    store.backend = backend = FakeTokenStore()
+
+    async def main():
+        await store.set("a", "genshin_1", 0)
+        assert await store.get("a") == "genshin_1"
+        assert await store.get("a") == "genshin_1"
+        assert backend.reads == 2
+
+    asyncio.run(main())
@@ -1,26 +1,56 @@
 from __future__ import annotations
 
 import asyncio
+import time
 import urllib.parse
-from typing import TYPE_CHECKING, Any
+from typing import Any, NamedTuple, Sequence
 
 import flet as ft
 
-from assets.assets import assets
+from assets.assets import AssetsTables, assets
+from env import config
 from fast_app.functions.pb import PBFunctions
 from . import pages
-from .enums import Game
-from .games import get_gacha_log_functions, BaseGachaItem
+from .enums import BANNER_TYPE_NAMES, Game
+from .games import GachaLogEntry, GachaLogFunctions, get_gacha_log_functions
+from .games.cache import history_versions
+from .games.stats import BannerStats
 from .schema import GachaParams
 
-if TYPE_CHECKING:
-    from collections.abc import Sequence
+
+class GachaAccount(NamedTuple):
+    """会话内已解析的账号"""
+
+    account_id: str
+    game: Game
+    uid: int
+    functions: GachaLogFunctions
+    version: str
+    """抽卡记录的数据版本"""
+    expire_at: float
+    """超过该时间（monotonic）后重新向 token 存储确认账号仍然有效"""
+
+
+class GachaLogPageData(NamedTuple):
+    """渲染一页抽卡记录所需的数据，可以提前在后台准备"""
+
+    entries: Sequence[GachaLogEntry]
+    total: int
+    stats: BannerStats | None
+    tables: AssetsTables
+    gacha_icons: dict[str, str]
 
 
 class WebApp:
     def __init__(self, page: ft.Page) -> None:
         self._page = page
         self._page.on_route_change = self.on_route_change
+        # 客户端保存的资源版本，首次使用时读取
+        self._gacha_icons_hash: str | None = None
+        self._account: GachaAccount | None = None
+        # 预取的页面，键为 (数据版本, 查询条件)
+        self._prefetch: dict[tuple[str, str], asyncio.Task] = {}
+        self._prefetch_lock = asyncio.Lock()
 
     async def initialize(self) -> None:
         self._page.theme_mode = ft.ThemeMode.DARK
@@ -39,90 +69,185 @@ class WebApp:
         if "gacha" in route:
             view = await self._handle_gacha_routes(route, parsed_params)
             page.title = "抽卡记录在线查询"
-            if view is not None:
+            if view is not None and view.appbar is None:
                 view.appbar = self.gacha_app_bar
 
         if view is None:
+            self._cancel_prefetch()
             return
 
-        view.scroll = ft.ScrollMode.AUTO
+        if page.views and page.views[-1] is view:
+            # 同一账号内翻页或筛选时原地更新，地址栏仍通过 go_async 同步
+            await view.refresh_async()
+        else:
+            view.scroll = ft.ScrollMode.AUTO
+
+            page.views.clear()
+            page.views.append(view)
+            await page.update_async()
 
-        page.views.clear()
-        page.views.append(view)
-        await page.update_async()
+        self._cancel_prefetch()
+        if isinstance(view, pages.GachaLogPage):
+            self._start_prefetch(view)
 
     async def _handle_gacha_routes(
         self, route: str, parsed_params: dict[str, str]
     ) -> ft.View | None:
-        page = self._page
-
         try:
             params = GachaParams(**parsed_params)
-            game, uid = await PBFunctions.get_uid_by_hash(params.account_id)
-            gacha_log_functions = get_gacha_log_functions(game)
-            params.uid = uid
+            account = await self._resolve_account(params.account_id)
         except ValueError:
             return pages.ErrorPage(code=422, message="Invalid parameters")
         except FileNotFoundError:
             return pages.ErrorPage(code=404, message="已失效，请尝试重新获取")
 
+        game, gacha_log_functions = account.game, account.functions
+        params.uid = account.uid
+
         if route == "/gacha_log":
-            filtered_logs = await gacha_log_functions.get_gacha_logs_base(params)
-            total_row = len(filtered_logs)
-            gacha_logs = filtered_logs[
-                (params.page - 1) * params.size : params.page * params.size
-            ]
-            gacha_icons, gacha_icons_hash = await self._get_gacha_icons(game, gacha_logs)
-            await asyncio.create_task(
-                page.client_storage.set_async("gacha_log.gacha_icons", gacha_icons)
-            )
-            await asyncio.create_task(
-                page.client_storage.set_async("gacha_log.gacha_icons_hash", gacha_icons_hash)
-            )
+            offset = (params.page - 1) * params.size
+            data = await self._get_gacha_log_page_data(account, params)
+            await self._sync_gacha_icons_hash(data.tables.hash)
 
-            view = pages.GachaLogPage(
-                gacha_histories=gacha_logs,
-                gacha_icons=gacha_icons,
-                game=game,
+            # 页面上的操作会修改 params，分批加载使用创建页面时的查询条件
+            query = params.model_copy(deep=True)
+
+            async def load_gacha_histories(start: int, count: int):
+                if await history_versions.get(game, account.uid) != account.version:
+                    # 抽卡记录已更新，不再追加旧页面的内容
+                    return [], {}
+                logs, _ = await gacha_log_functions.get_gacha_logs_slice(
+                    query, offset + start, count
+                )
+                return logs, assets.get_gacha_icons(game, (i.item.key for i in logs))
+
+            gacha_log_data = dict(
+                gacha_histories=data.entries,
+                gacha_icons=data.gacha_icons,
                 params=params,
-                max_page=(total_row + params.size - 1) // params.size,
+                max_page=(data.total + params.size - 1) // params.size,
+                stats=data.stats,
+                page_total=max(min(params.size, data.total - offset), 0),
+                load_gacha_histories=load_gacha_histories,
             )
+            current_view = self._page.views[-1] if self._page.views else None
+            if (
+                isinstance(current_view, pages.GachaLogPage)
+                and current_view.game is game
+                and current_view.params.account_id == params.account_id
+            ):
+                current_view.set_gacha_logs(**gacha_log_data)
+                return current_view
+            view = pages.GachaLogPage(game=game, **gacha_log_data)
         else:
             view = pages.ErrorPage(code=404, message="Not Found")
 
         return view
 
-    async def _get_gacha_icons(
-        self, game: Game, gachas: Sequence[BaseGachaItem]
-    ) -> tuple[dict[str | int, str], str]:
-        gacha_icons_hash = assets.get_hash()
-        cached_gacha_icons_hash: str = await self._page.client_storage.get_async("gacha_log.gacha_icons_hash") or ""
-        if gacha_icons_hash == cached_gacha_icons_hash:
-            cached_gacha_icons: dict[str | int, str] = (
-                    await self._page.client_storage.get_async("gacha_log.gacha_icons") or {}
+    @staticmethod
+    async def _load_gacha_log_page_data(
+        account: GachaAccount, params: GachaParams
+    ) -> GachaLogPageData:
+        # 大页面先渲染第一批，其余随滚动通过索引分批查询
+        offset = (params.page - 1) * params.size
+        chunk_size = min(config.web.grid_chunk_size or params.size, params.size)
+        entries, total = await account.functions.get_gacha_logs_slice(params, offset, chunk_size)
+        stats = await account.functions.get_gacha_stats(params)
+        # 图标和 hash 取自同一版本的图标表，不受期间热更新的影响
+        tables = assets.tables
+        gacha_icons = tables.get_gacha_icons(account.game, (i.item.key for i in entries))
+        return GachaLogPageData(entries, total, stats, tables, gacha_icons)
+
+    async def _get_gacha_log_page_data(
+        self, account: GachaAccount, params: GachaParams
+    ) -> GachaLogPageData:
+        """优先使用预取的结果，其余预取任务随之取消"""
+        task = self._prefetch.pop((account.version, params.to_query_string()), None)
+        self._cancel_prefetch()
+        data = await task if task is not None else None
+        if data is None:
+            return await self._load_gacha_log_page_data(account, params)
+        if data.tables is not assets.tables:
+            # 预取后图标表已热更新
+            tables = assets.tables
+            gacha_icons = tables.get_gacha_icons(account.game, (i.item.key for i in data.entries))
+            data = data._replace(tables=tables, gacha_icons=gacha_icons)
+        return data
+
+    async def _prefetch_gacha_log_page(
+        self, account: GachaAccount, params: GachaParams
+    ) -> GachaLogPageData | None:
+        # 同一会话的预取逐个执行，并先让出给前台的请求
+        async with self._prefetch_lock:
+            await asyncio.sleep(0)
+            try:
+                return await self._load_gacha_log_page_data(account, params)
+            except Exception:  # pylint: disable=W0718
+                # 预取失败时在实际访问时重新加载并显示错误
+                return None
+
+    def _start_prefetch(self, view: pages.GachaLogPage) -> None:
+        """在后台准备前后两页和其他卡池第一页，导航到其他页面时取消"""
+        account, params = self._account, view.params
+        queries = [
+            params.model_copy(update={"page": page}, deep=True)
+            for page in (params.page + 1, params.page - 1)
+            if 1 <= page <= view.max_page
+        ]
+        # 筛选对话框切换卡池时保留其他条件并回到第一页
+        queries.extend(
+            params.model_copy(update={"banner_type": banner_type, "page": 1}, deep=True)
+            for banner_type in BANNER_TYPE_NAMES[account.game]
+            if banner_type != params.banner_type
+        )
+        for query in queries:
+            key = (account.version, query.to_query_string())
+            self._prefetch[key] = asyncio.create_task(self._prefetch_gacha_log_page(account, query))
+
+    def _cancel_prefetch(self) -> None:
+        for task in self._prefetch.values():
+            task.cancel()
+        self._prefetch.clear()
+
+    async def _resolve_account(self, account_id: str) -> GachaAccount:
+        """解析 account_id，同一会话内翻页时复用上次的结果
+
+        token 的映射不会改变，只需在 token.local_ttl 秒后重新确认未过期；
+        数据版本从进程内缓存的 history_versions 读取，不访问 token 存储。
+        """
+        account = self._account
+        now = time.monotonic()
+        if account is None or account.account_id != account_id or account.expire_at <= now:
+            game, uid = await PBFunctions.get_uid_by_hash(account_id)
+            account = GachaAccount(
+                account_id=account_id,
+                game=game,
+                uid=uid,
+                functions=get_gacha_log_functions(game),
+                version=await history_versions.get(game, uid),
+                expire_at=now + config.token.local_ttl,
             )
         else:
-            cached_gacha_icons = {}
-        result: dict[str | int, str] = {}
-        for gacha in gachas:
-            key = gacha.key
-            if key in cached_gacha_icons:
-                result[key] = cached_gacha_icons[key]
-            else:
-                result[key] = assets.get_gacha_icon(game=game, item_id=key)
-                cached_gacha_icons[key] = result[key]
-
-        await asyncio.create_task(
-            self._page.client_storage.set_async(
-                "gacha_log.gacha_icons", cached_gacha_icons
-            )
-        )
-        await asyncio.create_task(
-            self._page.client_storage.set_async(
-                "gacha_log.gacha_icons_hash", gacha_icons_hash
+            version = await history_versions.get(account.game, account.uid)
+            if version != account.version:
+                account = account._replace(version=version)
+        self._account = account
+        return account
+
+    async def _sync_gacha_icons_hash(self, gacha_icons_hash: str) -> None:
+        """图标在服务端查找，客户端只记录资源版本，版本变化时才写入"""
+        if self._gacha_icons_hash is None:
+            self._gacha_icons_hash = (
+                await self._page.client_storage.get_async("gacha_log.gacha_icons_hash") or ""
             )
-        )
-        return result, gacha_icons_hash
+        if self._gacha_icons_hash == gacha_icons_hash:
+            return
+        client_storage = self._page.client_storage
+        await client_storage.set_async("gacha_log.gacha_icons_hash", gacha_icons_hash)
+        # 旧版本在客户端保存了完整的图标表，不再使用
+        if await client_storage.contains_key_async("gacha_log.gacha_icons"):
+            await client_storage.remove_async("gacha_log.gacha_icons")
+        self._gacha_icons_hash = gacha_icons_hash
 
     @property
     def gacha_app_bar(self) -> ft.AppBar:
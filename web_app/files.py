@@ -0,0 +1,33 @@
+"""文件写入
+
+先写同目录下的临时文件，完成后用 replace 原子替换，读取方不会读到写了一半的文件。
+临时文件名带随机后缀，多个进程同时写同一文件时互不干扰，写入失败时删除临时文件。
+"""
+
+import os
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator
+
+import aiofiles
+import aiofiles.os
+
+
+@asynccontextmanager
+async def temp_file(path: Path) -> AsyncIterator[Path]:
+    """与 path 同目录的临时文件路径，退出时仍未被替换到 path 的临时文件会被删除"""
+    path.parent.mkdir(exist_ok=True, parents=True)
+    temp_path = path.with_name(f".{path.name}.{os.urandom(4).hex()}.tmp")
+    try:
+        yield temp_path
+    finally:
+        if await aiofiles.os.path.exists(temp_path):
+            await aiofiles.os.remove(temp_path)
+
+
+async def atomic_write(path: Path, content: bytes) -> None:
+    """把 content 原子地写入 path"""
+    async with temp_file(path) as temp_path:
+        async with aiofiles.open(temp_path, "wb") as f:
+            await f.write(content)
+        await aiofiles.os.replace(temp_path, path)
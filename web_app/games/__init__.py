@@ -1,32 +1,31 @@
-from .base import BaseGachaLogInfo, BaseGachaItem, BaseGachaLogFunctions
-from .genshin import genshin_gacha_log_functions
-from .starrail import starrail_gacha_log_functions
-from .zzz import zzz_gacha_log_functions
-from .mc import mc_gacha_log_functions
+from typing import Type
 
-from typing import TYPE_CHECKING
-
-if TYPE_CHECKING:
-    from web_app.enums import Game
+from web_app.enums import Game
 
+from . import genshin, mc, starrail, zzz
+from .base import BaseGachaLogInfo, BaseGachaItem, GachaLogEntry, GachaLogFunctions
 
 __all__ = [
     "BaseGachaLogInfo",
     "BaseGachaItem",
-    "genshin_gacha_log_functions",
-    "starrail_gacha_log_functions",
-    "zzz_gacha_log_functions",
-    "mc_gacha_log_functions",
+    "GachaLogEntry",
+    "GachaLogFunctions",
+    "GACHA_LOG_INFO_TYPES",
+    "get_gacha_log_functions",
 ]
 
+GACHA_LOG_INFO_TYPES: dict[Game, Type[BaseGachaLogInfo]] = {
+    Game.GENSHIN: genshin.GachaLogInfo,
+    Game.STARRAIL: starrail.GachaLogInfo,
+    Game.ZZZ: zzz.GachaLogInfo,
+    Game.MC: mc.GachaLogInfo,
+}
+"""各游戏抽卡记录的结构，读取、缓存和索引等流程由 GachaLogFunctions 统一处理"""
+
+GACHA_LOG_FUNCTIONS: dict[Game, GachaLogFunctions] = {
+    game: GachaLogFunctions(game, info_type) for game, info_type in GACHA_LOG_INFO_TYPES.items()
+}
 
-def get_gacha_log_functions(game: "Game") -> BaseGachaLogFunctions:
-    from web_app.enums import Game
 
-    if game is Game.GENSHIN:
-        return genshin_gacha_log_functions
-    if game is Game.STARRAIL:
-        return starrail_gacha_log_functions
-    if game is Game.ZZZ:
-        return zzz_gacha_log_functions
-    return mc_gacha_log_functions
+def get_gacha_log_functions(game: Game) -> GachaLogFunctions:
+    return GACHA_LOG_FUNCTIONS[game]
@@ -1,17 +1,23 @@
 import asyncio
 import datetime
-from abc import abstractmethod
+import os
 from pathlib import Path
-from typing import Any, TYPE_CHECKING, List
+from typing import TYPE_CHECKING, List, NamedTuple, Type
 
 import aiofiles
-import pytz
-import ujson as json
-from pydantic import BaseModel
+import aiofiles.os
+from pydantic import BaseModel, ValidationError
 
-from fast_app.scheduler import scheduler
+from web_app.files import atomic_write
+from .cache import history_cache, history_versions
+from .columns import GachaLogColumns
+from .decoder import history_decoder
+from .search import search_names
+from .snapshot import SNAPSHOT_SUFFIX, load_snapshot, map_snapshot
+from .stats import BannerStats, get_banner_stats
 
 if TYPE_CHECKING:
+    from web_app.enums import Game
     from web_app.schema import GachaParams
 
 
@@ -28,67 +34,146 @@ class BaseGachaItem(BaseModel):
         return self.name
 
 
+class GachaLogEntry(NamedTuple):
+    """页面上的一抽，附带查看详情所需的数据"""
+
+    item: BaseGachaItem
+    position: int
+    """在卡池中的下标，按抽取顺序"""
+    pity: int
+    """距离上一个同星级或更高星级物品的抽数（含本抽）"""
+
+
 class BaseGachaLogInfo(BaseModel):
     user_id: str
     uid: str
     update_time: datetime.datetime
 
 
-class BaseGachaLogFunctions:
+class GachaLogFunctions:
+    """抽卡记录的读取与查询，各游戏共用，只有抽卡记录的结构不同"""
+
     BASE_DATA_PATH = Path("data") / "gacha_log"
-    DATA_MAP: dict[int, Any]
-    DATA_MAP_LOCK: asyncio.Lock
+    LOADING_MAP: dict[tuple[int, str], "asyncio.Task"]
 
-    def __init__(self):
+    def __init__(self, game: "Game", info_type: Type[BaseGachaLogInfo]):
+        self.game = game
+        self.info_type = info_type
+        self.gacha_log_path = self.BASE_DATA_PATH / game.value
         self.BASE_DATA_PATH.mkdir(exist_ok=True, parents=True)
-        self.DATA_MAP = {}
-        self.DATA_MAP_LOCK = asyncio.Lock()
+        self.LOADING_MAP = {}
 
     @staticmethod
-    async def load_json(path):
-        async with aiofiles.open(path, "r", encoding="utf-8") as f:
-            return json.loads(await f.read())
-
-    @abstractmethod
-    async def load_history_info(self, uid: int):
-        pass
-
-    @abstractmethod
-    async def get_history_info(self, uid: int):
-        pass
-
-    async def get_history_info_base(self, uid: int):
-        async with self.DATA_MAP_LOCK:
-            if uid not in self.DATA_MAP:
-                self.DATA_MAP[uid] = await self.load_history_info(uid)
-                # 1小时后删除缓存
-                scheduler.add_job(
-                    self.remove_history_info_from_map,
-                    "date",
-                    id=f"remove_history_info_from_map_{uid}",
-                    name=f"remove_history_info_from_map_{uid}",
-                    run_date=datetime.datetime.now(pytz.timezone("Asia/Shanghai"))
-                    + datetime.timedelta(seconds=3600),
-                    replace_existing=True,
-                    args=(uid,),
-                )
-            return self.DATA_MAP[uid]
-
-    async def remove_history_info_from_map(self, uid: int):
-        async with self.DATA_MAP_LOCK:
-            if uid in self.DATA_MAP:
-                del self.DATA_MAP[uid]
-
-    async def get_gacha_logs_base(self, params: "GachaParams") -> List[BaseGachaItem]:
+    async def load_bytes(path) -> bytes:
+        async with aiofiles.open(path, "rb") as f:
+            return await f.read()
+
+    def get_file_path(self, uid: int) -> Path:
+        return self.gacha_log_path / f"{uid}.json"
+
+    async def decode_history_file(self, file_path: Path, stat: os.stat_result) -> bytes:
+        """在执行器中读取并校验 JSON 抽卡记录
+        :return: 快照内容
+        """
+        return await history_decoder.decode(self.info_type, file_path, stat)
+
+    async def read_snapshot(self, file_path: Path, stat: os.stat_result):
+        snapshot_path = file_path.with_suffix(SNAPSHOT_SUFFIX)
+        try:
+            content = await asyncio.to_thread(map_snapshot, snapshot_path)
+        except (FileNotFoundError, ValueError):
+            return None
+        return load_snapshot(content, self.info_type, stat)
+
+    async def write_snapshot(self, file_path: Path, content: bytes) -> None:
+        await atomic_write(file_path.with_suffix(SNAPSHOT_SUFFIX), content)
+
+    async def load_history_info(self, uid: int) -> GachaLogColumns:
+        """读取历史抽卡记录数据，优先读取快照
+        :param uid: 游戏 uid
+        :return: 抽卡记录数据
+        """
+        file_path = self.get_file_path(uid)
+        stat = await aiofiles.os.stat(file_path)
+        history_info = await self.read_snapshot(file_path, stat)
+        if history_info is not None:
+            return history_info
+        try:
+            content = await self.decode_history_file(file_path, stat)
+        except ValidationError as exc:
+            # 无法解析的 JSON 视为文件不存在，字段校验错误照常抛出
+            if any(e["type"] == "json_invalid" for e in exc.errors()):
+                raise FileNotFoundError from exc
+            raise
+        # 快照缺失或已过期，重新生成
+        await self.write_snapshot(file_path, content)
+        return load_snapshot(content, self.info_type, stat)
+
+    async def get_history_info(self, uid: int) -> GachaLogColumns:
+        version = await history_versions.get(self.game, uid)
+        history_info = history_cache.get((self.game, uid), version)
+        if history_info is not None:
+            return history_info
+        # 同一 uid 同一版本的并发请求共享同一个加载任务，不同 uid 互不阻塞
+        key = (uid, version)
+        task = self.LOADING_MAP.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load_history_info_to_cache(uid, version))
+            self.LOADING_MAP[key] = task
+            task.add_done_callback(lambda t: self._remove_loading_task(key, t))
+        # shield: 单个请求被取消时不影响其他等待者
+        return await asyncio.shield(task)
+
+    def _remove_loading_task(self, key: tuple[int, str], task: "asyncio.Task"):
+        if self.LOADING_MAP.get(key) is task:
+            del self.LOADING_MAP[key]
+
+    async def _load_history_info_to_cache(self, uid: int, version: str):
+        history_info = await self.load_history_info(uid)
+        # 加载期间有新的上传则不写入缓存，避免旧数据覆盖
+        if version == await history_versions.get(self.game, uid):
+            size = history_info.nbytes
+            history_cache.set((self.game, uid), history_info, size, version)
+        return history_info
+
+    async def get_gacha_logs_page(
+        self, params: "GachaParams"
+    ) -> tuple[List[BaseGachaItem], int]:
+        """只取出当前页的抽卡记录
+        :return: 当前页的抽卡记录和筛选后的总数
+        """
+        entries, total = await self.get_gacha_logs_slice(
+            params, (params.page - 1) * params.size, params.size
+        )
+        return [i.item for i in entries], total
+
+    async def get_gacha_logs_slice(
+        self, params: "GachaParams", offset: int, limit: int
+    ) -> tuple[List[GachaLogEntry], int]:
+        """取出筛选结果（按时间倒序）中 [offset, offset + limit) 的抽卡记录
+        :return: 抽卡记录及其在卡池中的下标和抽数，筛选后的总数
+        """
         history_info = await self.get_history_info(params.uid)
         items = history_info.item_list.get(params.banner_type)
         if not items:
-            return []
-        data = []
-        for i in items[::-1]:
-            if params.rarities and i.rank_type not in params.rarities:
-                continue
-            if params.name_contains and params.name_contains not in i.name:
-                continue
-            data.append(i)
-        return data
+            return [], 0
+        index = items.index
+        names = search_names(self.game, params.name_contains, index.names)
+        results_nbytes = index.results_nbytes
+        positions, total = index.query(params.rarities, names, offset, limit)
+        # 新缓存的筛选结果计入抽卡记录缓存的大小
+        history_cache.resize(
+            (self.game, params.uid), history_info, index.results_nbytes - results_nbytes
+        )
+        entries = [
+            GachaLogEntry(item, position, index.pities[position])
+            for item, position in zip(items.take(positions)[:], positions)
+        ]
+        return entries, total
+
+    async def get_gacha_stats(self, params: "GachaParams") -> BannerStats | None:
+        history_info = await self.get_history_info(params.uid)
+        items = history_info.item_list.get(params.banner_type)
+        if items is None:
+            return None
+        return get_banner_stats(self.game, params.banner_type, items)
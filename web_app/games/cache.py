@@ -0,0 +1,185 @@
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Hashable, NamedTuple, TYPE_CHECKING
+
+import aiofiles.os
+
+from env import config
+
+if TYPE_CHECKING:
+    from web_app.enums import Game
+
+
+class CacheEntry(NamedTuple):
+    value: Any
+    size: int
+    expire_at: float
+    version: str = ""
+
+
+class HistoryVersions:
+    """每个 (game, uid) 的数据版本号，各级缓存据此判断是否失效
+
+    版本号由抽卡记录文件的 inode 和修改时间生成，上传时文件被原子替换，版本号随之改变。
+    多个 worker 与重启后都能得到一致的版本号；结果在进程内缓存 check_interval 秒，
+    本进程上传后调用 bump 立即刷新，其他 worker 最多延迟 check_interval 秒。
+    """
+
+    MAX_SIZE = 65536
+
+    def __init__(self, get_path: Callable[["Game", int], Path], check_interval: float):
+        """
+        :param get_path: 返回 (game, uid) 对应的抽卡记录文件路径
+        :param check_interval: 重新检查文件状态的间隔（秒）
+        """
+        self.get_path = get_path
+        self.check_interval = check_interval
+        self._versions: OrderedDict[tuple["Game", int], tuple[str, float]] = OrderedDict()
+
+    async def get(self, game: "Game", uid: int) -> str:
+        key = (game, uid)
+        cached = self._versions.get(key)
+        if cached is not None and cached[1] > time.monotonic():
+            return cached[0]
+        return await self.bump(game, uid)
+
+    async def bump(self, game: "Game", uid: int) -> str:
+        """重新读取文件状态，上传新的抽卡记录后调用，在线程中 stat 不阻塞事件循环"""
+        expire_at = time.monotonic() + self.check_interval
+        try:
+            stat = await aiofiles.os.stat(self.get_path(game, uid))
+            version = f"{stat.st_ino:x}.{stat.st_mtime_ns:x}"
+        except FileNotFoundError:
+            version = ""
+        key = (game, uid)
+        cached = self._versions.get(key)
+        if cached is not None and cached[1] > expire_at:
+            # 等待期间已有更晚开始的读取（如上传后的 bump），以其结果为准
+            return cached[0]
+        self._versions[key] = (version, expire_at)
+        self._versions.move_to_end(key)
+        if len(self._versions) > self.MAX_SIZE:
+            self._versions.popitem(last=False)
+        return version
+
+
+class HistoryCache:
+    """抽卡记录内存缓存
+
+    LRU 淘汰 + 滑动过期，同时限制条目数和估算的内存占用，过期条目在访问时或定时 sweep 时清理
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: OrderedDict[Hashable, CacheEntry] = OrderedDict()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and entry.expire_at > time.monotonic()
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def get(self, key: Hashable, version: str = "") -> Any:
+        entry = self._entries.get(key)
+        now = time.monotonic()
+        if entry is None or entry.expire_at <= now or entry.version != version:
+            if entry is not None:
+                self._remove(key)
+                self.evictions += 1
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries[key] = entry._replace(expire_at=now + self.ttl)
+        self._entries.move_to_end(key)
+        return entry.value
+
+    def set(self, key: Hashable, value: Any, size: int = 0, version: str = "") -> None:
+        if key in self._entries:
+            self._remove(key)
+        expire_at = time.monotonic() + self.ttl
+        self._entries[key] = CacheEntry(value, size, expire_at, version)
+        self._size += size
+        self._evict()
+
+    def resize(self, key: Hashable, value: Any, delta: int) -> None:
+        """缓存的值占用的内存变化后调整估算大小，超出上限时淘汰最久未使用的条目
+        :param value: 发生变化的值，缓存中已是其他值时忽略
+        :param delta: 增加的字节数
+        """
+        entry = self._entries.get(key)
+        if entry is None or entry.value is not value or not delta:
+            return
+        self._entries[key] = entry._replace(size=entry.size + delta)
+        self._size += delta
+        self._evict()
+
+    def pop(self, key: Hashable) -> Any:
+        if key not in self._entries:
+            return None
+        return self._remove(key).value
+
+    def sweep(self) -> int:
+        """清理所有已过期的条目
+        :return: 清理的条目数
+        """
+        now = time.monotonic()
+        expired = [k for k, v in self._entries.items() if v.expire_at <= now]
+        for key in expired:
+            self._remove(key)
+        self.evictions += len(expired)
+        return len(expired)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._size = 0
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def _evict(self) -> None:
+        while self._entries and (
+            len(self._entries) > self.max_entries or self._size > self.max_bytes
+        ):
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, key: Hashable) -> CacheEntry:
+        entry = self._entries.pop(key)
+        self._size -= entry.size
+        return entry
+
+
+def get_history_file_path(game: "Game", uid: int) -> Path:
+    """与读取抽卡记录时使用同一路径，数据目录只在 GachaLogFunctions 中定义"""
+    from web_app.games import get_gacha_log_functions
+
+    return get_gacha_log_functions(game).get_file_path(uid)
+
+
+history_versions = HistoryVersions(
+    get_path=get_history_file_path,
+    check_interval=config.cache.version_check_interval,
+)
+history_cache = HistoryCache(
+    max_entries=config.cache.max_entries,
+    max_bytes=config.cache.max_bytes,
+    ttl=config.cache.ttl,
+)
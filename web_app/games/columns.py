@@ -0,0 +1,295 @@
+"""抽卡记录的列式存储
+
+每个卡池按字段分别保存为紧凑数组：时间为微秒时间戳，星级为单字节，数字形式的 id 保存为整数，
+名称等重复字符串只保存一份并用下标引用。只有当前页面需要展示的记录才会创建 GachaItem 对象。
+"""
+
+import datetime
+from array import array
+from collections.abc import Mapping, Sequence
+from typing import Callable, Iterable, Iterator, Type, TypeVar, get_args, overload
+
+from pydantic import BaseModel
+
+from .index import BannerIndex
+
+T = TypeVar("T", bound=BaseModel)
+
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+NAIVE_EPOCH = datetime.datetime(1970, 1, 1)
+MICROSECOND = datetime.timedelta(microseconds=1)
+INT64_MAX = str(2**63 - 1)
+
+
+def get_item_type(info_type: Type[BaseModel]) -> Type[BaseModel]:
+    """从 item_list: Dict[str, List[GachaItem]] 中取出 GachaItem"""
+    list_type = get_args(info_type.model_fields["item_list"].annotation)[1]
+    return get_args(list_type)[0]
+
+
+def construct(model_type: Type[T], values: dict, fields_set: set[str]) -> T:
+    """跳过校验直接创建模型，数据已在上传或首次读取时校验过
+
+    与 model_construct 等价，但不再逐个处理默认值和别名，大量创建时明显更快
+    """
+    model = model_type.__new__(model_type)
+    object.__setattr__(model, "__dict__", values)
+    object.__setattr__(model, "__pydantic_fields_set__", fields_set)
+    object.__setattr__(model, "__pydantic_extra__", None)
+    object.__setattr__(model, "__pydantic_private__", None)
+    return model
+
+
+class IntColumn:
+    __slots__ = ("data",)
+
+    def __init__(self, data: array):
+        self.data = data
+
+    @classmethod
+    def from_values(cls, values: list[int]) -> "IntColumn":
+        typecode = "b" if all(-128 <= v < 128 for v in values) else "q"
+        return cls(array(typecode, values))
+
+    def __getitem__(self, index: int):
+        return self.data[index]
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.data) * self.data.itemsize
+
+
+class NumericStrColumn(IntColumn):
+    """纯数字字符串（如抽卡记录 id）按 int64 保存"""
+
+    __slots__ = ()
+
+    @staticmethod
+    def is_numeric(value: str) -> bool:
+        if not (value.isascii() and value.isdigit()):
+            return False
+        if value[0] == "0":
+            return value == "0"
+        return len(value) < len(INT64_MAX) or (
+            len(value) == len(INT64_MAX) and value <= INT64_MAX
+        )
+
+    @classmethod
+    def from_values(cls, values: list[str]) -> "NumericStrColumn":
+        return cls(array("q", map(int, values)))
+
+    def __getitem__(self, index: int) -> str:
+        return str(self.data[index])
+
+
+class StringColumn:
+    """重复字符串只保存一份，codes 为每条记录在 table 中的下标"""
+
+    __slots__ = ("codes", "table")
+
+    def __init__(self, codes: array, table: list[str]):
+        self.codes = codes
+        self.table = table
+
+    @classmethod
+    def from_values(cls, values: list[str]) -> "StringColumn":
+        lookup: dict[str, int] = {}
+        codes = array("I", [lookup.setdefault(v, len(lookup)) for v in values])
+        return cls(codes, list(lookup))
+
+    def __getitem__(self, index: int) -> str:
+        return self.table[self.codes[index]]
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.codes) * self.codes.itemsize + sum(
+            len(i) for i in self.table
+        )
+
+
+class TimeColumn:
+    """时间保存为微秒时间戳，所有记录时区相同时还原为原时区，否则还原为 UTC"""
+
+    __slots__ = ("data", "tz")
+
+    def __init__(self, data: array, tz: datetime.tzinfo | None):
+        self.data = data
+        self.tz = tz
+
+    @classmethod
+    def from_values(cls, values: list[datetime.datetime]) -> "TimeColumn":
+        offsets = {v.utcoffset() for v in values}
+        if offsets == {None}:
+            return cls(array("q", [(v - NAIVE_EPOCH) // MICROSECOND for v in values]), None)
+        tz = datetime.timezone(offsets.pop()) if len(offsets) == 1 else datetime.timezone.utc
+        values = [v.replace(tzinfo=tz) if v.tzinfo is None else v for v in values]
+        return cls(array("q", [(v - EPOCH) // MICROSECOND for v in values]), tz)
+
+    def __getitem__(self, index: int) -> datetime.datetime:
+        delta = datetime.timedelta(microseconds=self.data[index])
+        if self.tz is None:
+            return NAIVE_EPOCH + delta
+        return (EPOCH + delta).astimezone(self.tz)
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.data) * self.data.itemsize
+
+
+def build_column(name: str, annotation, values: list):
+    if annotation is int:
+        return IntColumn.from_values(values)
+    if annotation is datetime.datetime:
+        return TimeColumn.from_values(values)
+    is_id = name == "id" or name.endswith("_id")
+    if is_id and all(NumericStrColumn.is_numeric(v) for v in values):
+        return NumericStrColumn.from_values(values)
+    return StringColumn.from_values(values)
+
+
+class GachaColumns:
+    """单个卡池的抽卡记录，按抽取顺序保存"""
+
+    __slots__ = ("item_type", "columns", "length", "_index")
+
+    def __init__(
+        self,
+        item_type: Type[BaseModel],
+        columns: dict,
+        length: int,
+        index: BannerIndex | None = None,
+    ):
+        self.item_type = item_type
+        self.columns = columns
+        self.length = length
+        self._index = index
+
+    @classmethod
+    def from_items(cls, item_type: Type[BaseModel], items: list[BaseModel]) -> "GachaColumns":
+        columns = {
+            name: build_column(name, field.annotation, [getattr(i, name) for i in items])
+            for name, field in item_type.model_fields.items()
+        }
+        return cls(item_type, columns, len(items))
+
+    def __len__(self) -> int:
+        return self.length
+
+    @overload
+    def __getitem__(self, index: int) -> BaseModel: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[BaseModel]: ...
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.get_item(i) for i in range(self.length)[index]]
+        return self.get_item(range(self.length)[index])
+
+    def __iter__(self) -> Iterator[BaseModel]:
+        return (self.get_item(i) for i in range(self.length))
+
+    def get_item(self, index: int) -> BaseModel:
+        values = {name: column[index] for name, column in self.columns.items()}
+        return construct(self.item_type, values, set(self.columns))
+
+    def take(self, positions: Sequence[int]) -> "GachaItemSequence":
+        return GachaItemSequence(self, positions)
+
+    @property
+    def index(self) -> BannerIndex:
+        """筛选索引，快照中没有时在首次使用时构建，随缓存一同释放"""
+        if self._index is None:
+            self._index = BannerIndex.build(self)
+        return self._index
+
+    @property
+    def nbytes(self) -> int:
+        size = sum(column.nbytes for column in self.columns.values())
+        if self._index is not None:
+            size += self._index.nbytes
+        return size
+
+
+class GachaItemSequence(Sequence):
+    """按下标引用卡池中的记录，只在取出时创建 GachaItem"""
+
+    def __init__(self, columns: GachaColumns, positions: Sequence[int]):
+        self.columns = columns
+        self.positions = positions
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.columns.get_item(i) for i in self.positions[index]]
+        return self.columns.get_item(self.positions[index])
+
+
+class LazyItemList(Mapping):
+    """按需解码的卡池字典，只有访问到的卡池才会调用 load"""
+
+    def __init__(
+        self, banners: Iterable[str], load: Callable[[str], GachaColumns], nbytes: int = 0
+    ):
+        self.banners = list(banners)
+        self.load = load
+        self.loaded: dict[str, GachaColumns] = {}
+        self.nbytes = nbytes
+        """数据的大小，用于估算内存占用"""
+
+    def __getitem__(self, banner: str) -> GachaColumns:
+        columns = self.loaded.get(banner)
+        if columns is None:
+            if banner not in self.banners:
+                raise KeyError(banner)
+            columns = self.loaded[banner] = self.load(banner)
+        return columns
+
+    def __contains__(self, banner) -> bool:
+        return banner in self.banners
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.banners)
+
+    def __len__(self) -> int:
+        return len(self.banners)
+
+
+class GachaLogColumns:
+    """列式存储的抽卡记录，字段与 GachaLogInfo 一致"""
+
+    __slots__ = ("user_id", "uid", "update_time", "item_list")
+
+    def __init__(
+        self,
+        user_id: str,
+        uid: str,
+        update_time: datetime.datetime,
+        item_list: Mapping[str, GachaColumns],
+    ):
+        self.user_id = user_id
+        self.uid = uid
+        self.update_time = update_time
+        self.item_list = item_list
+
+    @classmethod
+    def from_info(cls, history_info) -> "GachaLogColumns":
+        item_type = get_item_type(type(history_info))
+        return cls(
+            user_id=history_info.user_id,
+            uid=history_info.uid,
+            update_time=history_info.update_time,
+            item_list={
+                banner: GachaColumns.from_items(item_type, items)
+                for banner, items in history_info.item_list.items()
+            },
+        )
+
+    @property
+    def nbytes(self) -> int:
+        if isinstance(self.item_list, LazyItemList):
+            # 避免为估算大小而解码所有卡池
+            return self.item_list.nbytes
+        return sum(i.nbytes for i in self.item_list.values())
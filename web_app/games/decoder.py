@@ -0,0 +1,95 @@
+"""抽卡记录解码
+
+JSON 解析、pydantic 校验和列式转换都是 CPU 密集的操作，在事件循环中执行会阻塞所有 Flet 会话。
+解码交给进程池（或线程池）完成，只把编码后的快照内容传回事件循环，再零拷贝地映射为 GachaLogColumns。
+
+pydantic 校验期间不会释放 GIL，线程池只能把阻塞拆散，要让事件循环保持响应应使用进程池。
+"""
+
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from pathlib import Path
+from typing import Optional, Type
+
+from pydantic import BaseModel
+
+from env import config
+from .columns import GachaLogColumns
+from .snapshot import dump_snapshot
+
+
+def decode_history_file(info_type: Type[BaseModel], file_path: Path, stat: os.stat_result) -> bytes:
+    """读取并校验 JSON 抽卡记录，在执行器中运行
+    :param info_type: 抽卡记录类型
+    :param file_path: JSON 文件路径
+    :param stat: JSON 文件的 stat，写入快照头部
+    :return: 快照内容
+    """
+    with open(file_path, "rb") as f:
+        history_info = info_type.model_validate_json(f.read())
+    return dump_snapshot(GachaLogColumns.from_info(history_info), stat)
+
+
+def warm_up() -> None:
+    """在子进程中执行的空任务，用于预先启动进程池"""
+
+
+class HistoryDecoder:
+    def __init__(self, executor: str, max_workers: int):
+        self.executor_type = executor
+        self.max_workers = max_workers or None
+        self._executor: Optional[Executor] = None
+
+    @property
+    def executor(self) -> Optional[Executor]:
+        if self._executor is None:
+            if self.executor_type == "process":
+                # 主进程中已有调度器等线程，使用 spawn 而不是 fork
+                self._executor = ProcessPoolExecutor(
+                    self.max_workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            elif self.executor_type == "thread":
+                self._executor = ThreadPoolExecutor(
+                    self.max_workers, thread_name_prefix="history_decoder"
+                )
+        return self._executor
+
+    async def start(self) -> None:
+        """预先创建执行器，进程池同时启动全部子进程并等待其完成导入"""
+        executor = self.executor
+        if not isinstance(executor, ProcessPoolExecutor):
+            return
+        loop = asyncio.get_running_loop()
+        # 子进程按提交的任务数逐个启动，同时提交与进程数相同的任务
+        count = self.max_workers or os.cpu_count() or 1
+        await asyncio.gather(*(loop.run_in_executor(executor, warm_up) for _ in range(count)))
+
+    async def decode(
+        self, info_type: Type[BaseModel], file_path: Path, stat: os.stat_result
+    ) -> bytes:
+        func = partial(decode_history_file, info_type, file_path, stat)
+        executor = self.executor
+        if executor is None:
+            return func()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, func)
+        except BrokenProcessPool:
+            # 子进程异常退出后进程池不可再用，下次调用时重新创建
+            if self._executor is executor:
+                self._executor = None
+            raise
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+
+history_decoder = HistoryDecoder(
+    executor=config.loader.executor,
+    max_workers=config.loader.max_workers,
+)
@@ -0,0 +1,173 @@
+import heapq
+from array import array
+from collections import OrderedDict
+from typing import TYPE_CHECKING, AbstractSet, Iterable, Sequence
+
+from env import config
+
+if TYPE_CHECKING:
+    from .columns import GachaColumns
+    from .stats import BannerStats
+
+
+class BannerIndex:
+    """单个卡池的筛选索引
+
+    按星级和名称分别记录抽卡记录的下标（升序），筛选时只需取出对应的下标列表，
+    各列表互不重叠，总数为长度之和。需要归并多个列表时，归并结果按筛选条件缓存，
+    翻页时直接切片，缓存同时限制条数和字节数。索引随抽卡记录一同缓存，数据更新或缓存淘汰时一并释放。
+    上传时构建的索引会写入快照，读取快照时各下标数组直接引用映射的内存。
+    pities 记录每一抽距离上一个同星级或更高星级物品的抽数（含本抽），查看单抽详情时直接取用。
+    """
+
+    __slots__ = (
+        "length",
+        "ranks",
+        "names",
+        "name_codes",
+        "rarity_positions",
+        "name_positions",
+        "name_ranks",
+        "pities",
+        "results",
+        "results_nbytes",
+        "stats",
+    )
+
+    def __init__(
+        self,
+        length: int,
+        ranks: Sequence[int],
+        names: list[str],
+        rarity_positions: dict[int, Sequence[int]],
+        name_positions: list[Sequence[int]],
+        name_ranks: list[int | None],
+        pities: Sequence[int],
+    ):
+        self.length = length
+        self.ranks = ranks
+        self.names = names
+        self.name_codes = {name: code for code, name in enumerate(names)}
+        self.rarity_positions = rarity_positions
+        self.name_positions = name_positions
+        self.name_ranks = name_ranks
+        self.pities = pities
+        self.results: OrderedDict[tuple, array] = OrderedDict()
+        self.results_nbytes = 0
+        """缓存的归并结果占用的字节数"""
+        self.stats: "BannerStats | None" = None
+
+    @classmethod
+    def build(cls, columns: "GachaColumns") -> "BannerIndex":
+        ranks = columns.columns["rank_type"].data
+        names = columns.columns["name"].table
+        rarity_positions: dict[int, array] = {}
+        for position, rank in enumerate(ranks):
+            if rank not in rarity_positions:
+                rarity_positions[rank] = array("I")
+            rarity_positions[rank].append(position)
+        name_positions = [array("I") for _ in names]
+        for position, code in enumerate(columns.columns["name"].codes):
+            name_positions[code].append(position)
+        # 同名物品星级相同时记录星级，星级筛选可以直接整组取舍
+        name_ranks: list[int | None] = []
+        for positions in name_positions:
+            group_ranks = {ranks[i] for i in positions}
+            name_ranks.append(group_ranks.pop() if len(group_ranks) == 1 else None)
+        return cls(
+            len(columns),
+            ranks,
+            names,
+            rarity_positions,
+            name_positions,
+            name_ranks,
+            cls.build_pities(ranks),
+        )
+
+    @staticmethod
+    def build_pities(ranks: Sequence[int]) -> array:
+        """每一抽距离上一个同星级或更高星级物品的抽数，例如四星的计数在出四星或五星时重置"""
+        pities = array("I")
+        # 各星级最近一次被重置的下标，初始为 -1
+        last: dict[int, int] = {rank: -1 for rank in set(ranks)}
+        for position, rank in enumerate(ranks):
+            pities.append(position - last[rank])
+            for other in last:
+                if other <= rank:
+                    last[other] = position
+        return pities
+
+    @property
+    def nbytes(self) -> int:
+        groups = [
+            *self.rarity_positions.values(),
+            *self.name_positions,
+            self.pities,
+        ]
+        return sum(len(i) * i.itemsize for i in groups) + self.results_nbytes
+
+    def match_names(self, names: AbstractSet[str]) -> list[int]:
+        """名称集合中出现在本卡池的名称编号"""
+        codes = self.name_codes
+        if len(names) > len(codes):
+            return [code for name, code in codes.items() if name in names]
+        return [codes[name] for name in names if name in codes]
+
+    def groups(
+        self, rarities: Iterable[int] | None, names: AbstractSet[str] | None
+    ) -> list[Sequence[int]]:
+        """筛选出的下标分组，各组升序且互不重叠
+        :param rarities: 星级，为空时不筛选
+        :param names: 名称集合（由 search_names 解析搜索词得到），为 None 时不筛选
+        """
+        rarities = set(rarities or ())
+        if names is None:
+            if not rarities:
+                return [range(self.length)]
+            return [self.rarity_positions[i] for i in sorted(rarities) if i in self.rarity_positions]
+        groups: list[Sequence[int]] = []
+        for code in self.match_names(names):
+            positions = self.name_positions[code]
+            rank = self.name_ranks[code]
+            if not rarities or rank in rarities:
+                groups.append(positions)
+            elif rank is None:
+                groups.append(array("I", (i for i in positions if self.ranks[i] in rarities)))
+        return groups
+
+    def query(
+        self,
+        rarities: Iterable[int] | None,
+        names: frozenset[str] | None,
+        offset: int,
+        limit: int,
+    ) -> tuple[list[int], int]:
+        """按时间倒序分页
+        :return: 当前页的下标和筛选后的总数
+        """
+        key = (tuple(sorted(set(rarities or ()))), names)
+        positions = self.results.get(key)
+        if positions is not None:
+            self.results.move_to_end(key)
+        else:
+            groups = [i for i in self.groups(rarities, names) if i]
+            if len(groups) <= 1:
+                # 单个分组本身就是有序的，直接从末尾切片
+                group = groups[0] if groups else ()
+                end = max(len(group) - offset, 0)
+                return list(reversed(group[max(end - limit, 0) : end])), len(group)
+            positions = self.merge(key, groups)
+        return positions[offset : offset + limit].tolist(), len(positions)
+
+    def merge(self, key: tuple, groups: list[Sequence[int]]) -> array:
+        """按时间倒序归并多个下标分组，结果按筛选条件缓存，之后翻页只需切片"""
+        merged = heapq.merge(*(reversed(i) for i in groups), reverse=True)
+        positions = self.results[key] = array("I", merged)
+        self.results_nbytes += len(positions) * positions.itemsize
+        while self.results and (
+            len(self.results) > config.cache.max_filter_results
+            or self.results_nbytes > config.cache.max_filter_bytes
+        ):
+            _, evicted = self.results.popitem(last=False)
+            self.results_nbytes -= len(evicted) * evicted.itemsize
+        return positions
@@ -0,0 +1,106 @@
+"""物品名称搜索
+
+每个游戏一个 NameSearchIndex，收录图标表（assets/*.json）和已读取的抽卡记录中的物品名称。
+名称和搜索词都经过 NFKC 规范化（全角转半角）、忽略大小写和空白后比较。
+按字符建立倒排索引，搜索时取搜索词各字符对应名称集合的交集，只需确认少量候选是否包含搜索词。
+同时匹配拼音首字母，例如 "gy" 匹配 "甘雨"。
+
+搜索结果为名称集合，卡池索引按名称取出对应的下标分组，不需要逐条比较字符串。
+收录新名称时复制后整体替换（与图标表相同），可以在线程中收录，查询时不需要加锁。
+"""
+
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Iterable, NamedTuple, Optional
+
+from pypinyin import Style, lazy_pinyin
+
+from web_app.enums import Game
+
+
+def normalize(text: str) -> str:
+    return "".join(unicodedata.normalize("NFKC", text).casefold().split())
+
+
+def get_initials(name: str) -> str:
+    """拼音首字母，非汉字部分原样保留"""
+    return normalize("".join(lazy_pinyin(name, style=Style.FIRST_LETTER)))
+
+
+class NameSearchState(NamedTuple):
+    names: dict[str, tuple[str, str]]
+    """名称 -> (规范化的名称, 拼音首字母)"""
+    postings: dict[str, frozenset[str]]
+    """字符 -> 包含该字符的名称"""
+    results: OrderedDict[str, frozenset[str]]
+    """搜索结果缓存，收录新名称后随新状态清空"""
+
+
+class NameSearchIndex:
+    MAX_RESULTS = 1024
+
+    def __init__(self):
+        self._state = NameSearchState({}, {}, OrderedDict())
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._state.names)
+
+    def add(self, names: Iterable[str]) -> None:
+        """收录名称，已收录的名称直接跳过"""
+        state = self._state
+        new_names = [i for i in set(names) if i and i not in state.names]
+        if not new_names:
+            return
+        entries = {name: (normalize(name), get_initials(name)) for name in new_names}
+        with self._lock:
+            state = self._state
+            names = {**state.names, **entries}
+            postings = dict(state.postings)
+            added: dict[str, set[str]] = {}
+            for name, (key, initials) in entries.items():
+                for char in {*key, *initials}:
+                    added.setdefault(char, set()).add(name)
+            for char, char_names in added.items():
+                postings[char] = postings.get(char, frozenset()) | char_names
+            self._state = NameSearchState(names, postings, OrderedDict())
+
+    def match(self, query: str) -> frozenset[str]:
+        """名称或拼音首字母包含搜索词（包括以搜索词开头）的名称"""
+        query = normalize(query)
+        state = self._state
+        if not query:
+            return frozenset(state.names)
+        result = state.results.get(query)
+        if result is not None:
+            state.results.move_to_end(query)
+            return result
+        postings = sorted((state.postings.get(char, frozenset()) for char in set(query)), key=len)
+        candidates = postings[0].intersection(*postings[1:])
+        result = frozenset(
+            name
+            for name in candidates
+            if query in state.names[name][0] or query in state.names[name][1]
+        )
+        state.results[query] = result
+        while len(state.results) > self.MAX_RESULTS:
+            state.results.popitem(last=False)
+        return result
+
+
+name_search_indexes: dict[Game, NameSearchIndex] = {game: NameSearchIndex() for game in Game}
+
+
+def search_names(game: Game, query: Optional[str], names: Iterable[str] = ()) -> Optional[frozenset[str]]:
+    """把搜索词解析为名称集合
+    :param game: 游戏
+    :param query: 搜索词
+    :param names: 需要一并收录的名称，如当前卡池的名称表
+    :return: 匹配的名称，搜索词为空时返回 None 表示不筛选
+    """
+    if not query or not normalize(query):
+        return None
+    index = name_search_indexes[game]
+    index.add(names)
+    return index.match(query)
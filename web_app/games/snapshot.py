@@ -0,0 +1,218 @@
+"""抽卡记录快照
+
+上传时校验一次 JSON，并把转换后的列式数据写成二进制快照，之后读取时直接映射为 GachaLogColumns，
+跳过 JSON 解析、pydantic 校验和逐条创建对象。
+
+文件结构::
+
+    MAGIC | JSON 大小, 修改时间 | 目录长度 | 目录 (pickle) | 对齐 | 数据区
+
+目录只记录各卡池的长度和卡池描述在数据区中的位置；卡池描述 (pickle) 记录每一列和筛选索引各下标数组的
+类型和偏移，数组按 8 字节对齐原样保存在数据区。读取时通过 mmap 映射文件，只有被访问的卡池才会解析描述，
+各列和索引直接以 memoryview 引用映射的内存，不复制数据，多个 worker 读取同一快照时共享操作系统的页缓存。
+因此冷加载只需读取目录、一个卡池的描述和当前页用到的数据，耗时与总抽数无关。
+快照头部记录了对应 JSON 文件的大小和修改时间，不一致时视为过期。
+"""
+
+import mmap
+import os
+import pickle
+import struct
+from array import array
+from pathlib import Path
+from typing import Optional, Type
+
+from pydantic import BaseModel
+
+from .columns import (
+    GachaColumns,
+    GachaLogColumns,
+    IntColumn,
+    LazyItemList,
+    NumericStrColumn,
+    StringColumn,
+    TimeColumn,
+    get_item_type,
+)
+from .index import BannerIndex
+
+SNAPSHOT_MAGIC = b"GLSNAP5\n"
+SNAPSHOT_HEADER = struct.Struct("<qq")
+SNAPSHOT_DIRECTORY = struct.Struct("<Q")
+SNAPSHOT_SUFFIX = ".snapshot"
+ALIGNMENT = 8
+
+
+def align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def get_source_header(stat: os.stat_result) -> bytes:
+    return SNAPSHOT_MAGIC + SNAPSHOT_HEADER.pack(stat.st_size, stat.st_mtime_ns)
+
+
+def dump_column(column) -> tuple[tuple, memoryview]:
+    """返回列的描述和需要写入的数据"""
+    if isinstance(column, StringColumn):
+        data = column.codes
+        spec = ("string", column.table)
+    elif isinstance(column, TimeColumn):
+        data = column.data
+        spec = ("time", column.tz)
+    elif isinstance(column, NumericStrColumn):
+        data = column.data
+        spec = ("numeric",)
+    else:
+        data = column.data
+        spec = ("int",)
+    view = memoryview(data)
+    return (view.format, *spec), view.cast("B")
+
+
+def load_column(spec: tuple, data: memoryview):
+    typecode, kind, *args = spec
+    data = data.cast(typecode)
+    if kind == "string":
+        return StringColumn(data, args[0])
+    if kind == "time":
+        return TimeColumn(data, args[0])
+    if kind == "numeric":
+        return NumericStrColumn(data)
+    return IntColumn(data)
+
+
+class SnapshotWriter:
+    """按 8 字节对齐依次排列数据区中的数组"""
+
+    def __init__(self):
+        self.blobs: list[tuple[int, memoryview]] = []
+        self.size = 0
+
+    def add(self, data) -> int:
+        """:return: 数据在数据区中的偏移"""
+        view = memoryview(data).cast("B")
+        offset = self.size
+        self.blobs.append((offset, view))
+        self.size = align(offset + view.nbytes)
+        return offset
+
+
+def dump_banner(writer: SnapshotWriter, columns: GachaColumns) -> bytes:
+    specs = {}
+    for name, column in columns.columns.items():
+        spec, blob = dump_column(column)
+        specs[name] = (writer.add(blob), spec)
+    index = columns.index
+    rarity_specs = {
+        rank: (writer.add(positions), len(positions))
+        for rank, positions in index.rarity_positions.items()
+    }
+    name_bounds = [0]
+    name_positions = array("I")
+    for positions in index.name_positions:
+        name_positions.extend(positions)
+        name_bounds.append(len(name_positions))
+    index_spec = (
+        rarity_specs,
+        writer.add(name_positions),
+        name_bounds,
+        index.name_ranks,
+        writer.add(index.pities),
+    )
+    return pickle.dumps((specs, index_spec), protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def dump_snapshot(history_info: GachaLogColumns, stat: os.stat_result) -> bytes:
+    writer = SnapshotWriter()
+    banners = {}
+    for banner, columns in history_info.item_list.items():
+        description = dump_banner(writer, columns)
+        banners[banner] = (columns.length, writer.add(description), len(description))
+    item_fields = next((list(i.columns) for i in history_info.item_list.values()), [])
+    directory = pickle.dumps(
+        (
+            history_info.user_id,
+            history_info.uid,
+            history_info.update_time,
+            item_fields,
+            writer.size,
+            banners,
+        ),
+        protocol=pickle.HIGHEST_PROTOCOL,
+    )
+    header = get_source_header(stat) + SNAPSHOT_DIRECTORY.pack(len(directory)) + directory
+    data_start = align(len(header))
+    content = bytearray(data_start + writer.size)
+    content[: len(header)] = header
+    for offset, blob in writer.blobs:
+        position = data_start + offset
+        content[position : position + blob.nbytes] = blob
+    return bytes(content)
+
+
+def map_snapshot(path: Path) -> mmap.mmap:
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def load_banner(
+    data: memoryview, item_type: Type[BaseModel], length: int, offset: int, size: int
+) -> GachaColumns:
+    """解析单个卡池的描述，各列和索引引用 data 的内存"""
+    specs, index_spec = pickle.loads(data[offset : offset + size])
+
+    def get_bytes(start: int, typecode: str, count: int) -> memoryview:
+        return data[start : start + count * struct.calcsize(typecode)]
+
+    def get_array(start: int, typecode: str, count: int) -> memoryview:
+        return get_bytes(start, typecode, count).cast(typecode)
+
+    columns = {}
+    for name, (start, spec) in specs.items():
+        columns[name] = load_column(spec, get_bytes(start, spec[0], length))
+    rarity_specs, names_offset, name_bounds, name_ranks, pities_offset = index_spec
+    name_positions = get_array(names_offset, "I", name_bounds[-1])
+    index = BannerIndex(
+        length,
+        columns["rank_type"].data,
+        columns["name"].table,
+        {rank: get_array(start, "I", count) for rank, (start, count) in rarity_specs.items()},
+        [name_positions[a:b] for a, b in zip(name_bounds, name_bounds[1:])],
+        name_ranks,
+        get_array(pities_offset, "I", length),
+    )
+    return GachaColumns(item_type, columns, length, index)
+
+
+def load_snapshot(
+    content: mmap.mmap | bytes, info_type: Type[BaseModel], stat: os.stat_result
+) -> Optional[GachaLogColumns]:
+    """从快照读取抽卡记录，各卡池在首次访问时才解析，各列直接引用 content 的内存
+    :param content: 快照文件内容或其内存映射
+    :param info_type: 抽卡记录类型
+    :param stat: 对应 JSON 文件的 stat
+    :return: 抽卡记录，快照过期或格式不符时返回 None
+    """
+    header = get_source_header(stat)
+    if content[: len(header)] != header:
+        return None
+    view = memoryview(content)
+    try:
+        (directory_size,) = SNAPSHOT_DIRECTORY.unpack_from(view, len(header))
+        directory_start = len(header) + SNAPSHOT_DIRECTORY.size
+        directory = view[directory_start : directory_start + directory_size]
+        user_id, uid, update_time, item_fields, data_size, banners = pickle.loads(directory)
+    except Exception:  # pylint: disable=W0718
+        return None
+    item_type = get_item_type(info_type)
+    if banners and item_fields != list(item_type.model_fields):
+        return None
+    data_start = align(directory_start + directory_size)
+    if data_start + data_size > len(view):
+        return None
+    data = view[data_start : data_start + data_size]
+
+    def load(banner: str) -> GachaColumns:
+        return load_banner(data, item_type, *banners[banner])
+
+    return GachaLogColumns(user_id, uid, update_time, LazyItemList(banners, load, data_size))
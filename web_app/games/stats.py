@@ -0,0 +1,163 @@
+"""卡池统计
+
+统计基于 BannerIndex 中按星级分组的下标数组完成：最高星级的下标两两相减即为每次出金的抽数，
+计算量只与出金次数有关，与总抽数无关。结果缓存在索引上，随数据版本一同失效。
+"""
+
+import datetime
+import operator
+from collections import Counter
+from typing import TYPE_CHECKING
+
+from pydantic import BaseModel
+
+from web_app.enums import Game, BANNER_TYPE_NAMES
+
+if TYPE_CHECKING:
+    from .columns import GachaColumns
+
+TOP_RANKS: dict[Game, int] = {
+    Game.GENSHIN: 5,
+    Game.STARRAIL: 5,
+    Game.ZZZ: 4,
+    Game.MC: 5,
+}
+"""各游戏的最高星级，绝区零 S 级为 4"""
+
+STANDARD_ITEMS: dict[Game, dict[str, datetime.date | None]] = {
+    Game.GENSHIN: {
+        "迪卢克": None,
+        "琴": None,
+        "莫娜": None,
+        "七七": None,
+        "刻晴": None,
+        # 3.6 版本加入常驻池，此前在各自的限定池 UP
+        "提纳里": datetime.date(2023, 4, 12),
+        "迪希雅": datetime.date(2023, 4, 12),
+    },
+    Game.STARRAIL: dict.fromkeys(["姬子", "瓦尔特", "布洛妮娅", "杰帕德", "克拉拉", "彦卿", "白露"]),
+    Game.ZZZ: dict.fromkeys(["猫又", "丽娜", "珂蕾妲", "格莉丝", "莱卡恩", "「11号」"]),
+    Game.MC: dict.fromkeys(["凌阳", "卡卡罗", "安可", "维里奈", "鉴心"]),
+}
+"""常驻池最高星级角色及其加入常驻池的日期（None 为开服即常驻），
+在限定角色池中抽到且抽取时已是常驻即为小保底歪了。
+曾经限定 UP、之后才加入常驻的角色需要记录日期，否则其 UP 期间的抽取会被误判为歪。
+"""
+
+
+def is_standard_item(
+    standard_items: dict[str, datetime.date | None], name: str, time: datetime.datetime
+) -> bool:
+    """抽取时该物品是否已是常驻"""
+    if name not in standard_items:
+        return False
+    since = standard_items[name]
+    return since is None or time.date() >= since
+
+
+class BannerStats(BaseModel):
+    top_rank: int
+    """最高星级"""
+    total: int
+    """总抽数"""
+    pity: int
+    """距离上次出最高星级已抽数"""
+    top_count: int
+    """最高星级数量"""
+    second_count: int
+    """次高星级数量"""
+    average: float | None
+    """平均每个最高星级的抽数"""
+    pity_histogram: dict[int, int]
+    """出最高星级时的抽数分布"""
+    wins: int | None = None
+    """小保底不歪次数，仅限定角色池"""
+    losses: int | None = None
+    """小保底歪的次数，仅限定角色池"""
+    guaranteed: bool | None = None
+    """下一个最高星级是否为大保底，仅限定角色池"""
+
+    @property
+    def top_rate(self) -> float:
+        return self.top_count / self.total if self.total else 0.0
+
+    @property
+    def second_rate(self) -> float:
+        return self.second_count / self.total if self.total else 0.0
+
+    @property
+    def summary(self) -> str:
+        texts = [f"共 {self.total} 抽", f"已垫 {self.pity} 抽"]
+        texts.append(f"{self.top_rank} ★ {self.top_count} 个 ({self.top_rate:.2%})")
+        texts.append(f"{self.top_rank - 1} ★ {self.second_count} 个 ({self.second_rate:.2%})")
+        if self.average is not None:
+            texts.append(f"平均 {self.average:.1f} 抽出 {self.top_rank} ★")
+        if self.wins is not None and (self.wins or self.losses):
+            texts.append(f"小保底 {self.wins} 胜 {self.losses} 负")
+        return " · ".join(texts)
+
+
+def compute_banner_stats(
+    columns: "GachaColumns",
+    top_rank: int,
+    standard_items: dict[str, datetime.date | None] | None,
+) -> BannerStats:
+    """计算单个卡池的统计
+    :param columns: 卡池记录
+    :param top_rank: 最高星级
+    :param standard_items: 常驻最高星级物品名称及其加入常驻的日期，为 None 时不统计小保底
+    """
+    index = columns.index
+    total = len(columns)
+    top = index.rarity_positions.get(top_rank, ())
+    second = index.rarity_positions.get(top_rank - 1, ())
+    # 每次出金的抽数：首个为下标 + 1，之后为相邻下标之差
+    pities = [top[0] + 1, *map(operator.sub, top[1:], top[:-1])] if top else []
+    stats = BannerStats(
+        top_rank=top_rank,
+        total=total,
+        pity=total - top[-1] - 1 if top else total,
+        top_count=len(top),
+        second_count=len(second),
+        average=sum(pities) / len(pities) if pities else None,
+        pity_histogram=dict(sorted(Counter(pities).items())),
+    )
+    if standard_items is not None:
+        codes = columns.columns["name"].codes
+        times = columns.columns["time"]
+        standard_since = {
+            code: standard_items[name]
+            for code, name in enumerate(index.names)
+            if name in standard_items
+        }
+        wins = losses = 0
+        guaranteed = False
+        for position in top:
+            code = codes[position]
+            # 只有出金时才取时间，计算量仍只与出金次数有关
+            is_standard = code in standard_since and (
+                standard_since[code] is None
+                or times[position].date() >= standard_since[code]
+            )
+            if not guaranteed:
+                if is_standard:
+                    losses += 1
+                else:
+                    wins += 1
+            guaranteed = is_standard
+        stats.wins, stats.losses, stats.guaranteed = wins, losses, guaranteed
+    return stats
+
+
+def get_banner_stats(game: Game, banner_type: str, columns: "GachaColumns") -> BannerStats:
+    """获取卡池统计，结果缓存在卡池索引上"""
+    index = columns.index
+    if index.stats is None:
+        # 每个游戏的第一个卡池为限定角色池
+        is_character_banner = banner_type == BANNER_TYPE_NAMES[game][0]
+        index.stats = compute_banner_stats(
+            columns,
+            TOP_RANKS[game],
+            STANDARD_ITEMS[game] if is_character_banner else None,
+        )
+    return index.stats
@@ -6,12 +6,17 @@ from typing import TYPE_CHECKING
 import flet as ft
 
 from web_app.enums import Game, BANNER_TYPE_NAMES
-from web_app.games import BaseGachaItem
+from web_app.games import BaseGachaItem, GachaLogEntry
+from web_app.games.stats import BannerStats
 from web_app.schema import GachaParams
 from web_app.utils import show_error_banner
 
 if TYPE_CHECKING:
-    from collections.abc import Sequence
+    from collections.abc import Awaitable, Callable, Sequence
+
+    LoadGachaHistories = Callable[
+        [int, int], Awaitable[tuple[Sequence[GachaLogEntry], dict[str | int, str]]]
+    ]
 
 __all__ = ("GachaLogPage",)
 
@@ -20,17 +25,62 @@ class GachaLogPage(ft.View):
     def __init__(
         self,
         *,
-        gacha_histories: Sequence[BaseGachaItem],
+        gacha_histories: Sequence[GachaLogEntry],
         gacha_icons: dict[str | int, str],
         params: GachaParams,
         game: Game,
         max_page: int,
+        stats: BannerStats | None = None,
+        page_total: int | None = None,
+        load_gacha_histories: LoadGachaHistories | None = None,
     ) -> None:
         self.game = game
-        self.gachas = gacha_histories
-        self.gacha_icons = gacha_icons
-        self.params = params
-        self.max_page = max_page
+        self._loading = False
+
+        self.search_field = ft.TextField(
+            label="搜索",
+            prefix_icon=ft.icons.SEARCH,
+            on_submit=self.on_search_bar_submit,
+        )
+        self.previous_page_button = ft.IconButton(
+            icon=ft.icons.ARROW_BACK_IOS,
+            on_click=self.previous_page_on_click,
+        )
+        self.page_field = ft.TextField(
+            label="页数",
+            keyboard_type=ft.KeyboardType.NUMBER,
+            on_submit=self.page_field_on_submit,
+            width=80,
+        )
+        self.next_page_button = ft.IconButton(
+            icon=ft.icons.ARROW_FORWARD_IOS,
+            on_click=self.next_page_on_click,
+        )
+        self.stats_text = ft.Text()
+        self.grid = ft.GridView(
+            expand=1,
+            runs_count=5,
+            max_extent=100,
+            child_aspect_ratio=1.0,
+            spacing=16,
+            run_spacing=16,
+            on_scroll=self.on_scroll,
+            on_scroll_interval=200,
+        )
+        # 内容不足一屏时不会触发滚动事件，需要手动加载
+        self.load_more_button = ft.TextButton(
+            text="加载更多",
+            on_click=self.load_more_on_click,
+        )
+        self.set_gacha_logs(
+            gacha_histories=gacha_histories,
+            gacha_icons=gacha_icons,
+            params=params,
+            max_page=max_page,
+            stats=stats,
+            page_total=page_total,
+            load_gacha_histories=load_gacha_histories,
+        )
 
         super().__init__(
             controls=[
@@ -39,55 +89,69 @@ class GachaLogPage(ft.View):
                         [
                             ft.Row(
                                 [
-                                    ft.TextField(
-                                        label="搜索",
-                                        prefix_icon=ft.icons.SEARCH,
-                                        on_submit=self.on_search_bar_submit,
-                                        value=params.name_contains,
-                                    ),
+                                    self.search_field,
                                     ft.OutlinedButton(
                                         text="筛选条件",
                                         icon=ft.icons.FILTER_ALT,
                                         on_click=self.filter_button_on_click,
                                     ),
-                                    ft.IconButton(
-                                        icon=ft.icons.ARROW_BACK_IOS,
-                                        on_click=self.previous_page_on_click,
-                                        disabled=params.page == 1,
-                                    ),
-                                    ft.TextField(
-                                        label="页数",
-                                        value=str(params.page),
-                                        keyboard_type=ft.KeyboardType.NUMBER,
-                                        on_submit=self.page_field_on_submit,
-                                        width=80,
-                                    ),
-                                    ft.IconButton(
-                                        icon=ft.icons.ARROW_FORWARD_IOS,
-                                        on_click=self.next_page_on_click,
-                                        disabled=params.page == max_page,
-                                    ),
+                                    self.previous_page_button,
+                                    self.page_field,
+                                    self.next_page_button,
                                 ],
                                 wrap=True,
                             ),
-                            ft.GridView(
-                                self.gacha_log_controls,
-                                expand=1,
-                                runs_count=5,
-                                max_extent=100,
-                                child_aspect_ratio=1.0,
-                                spacing=16,
-                                run_spacing=16,
-                            ),
+                            self.stats_text,
+                            self.grid,
+                            self.load_more_button,
                         ]
                     ),
                     minimum_padding=8,
                 )
-            ]
+            ],
+            on_scroll=self.on_scroll,
+            on_scroll_interval=200,
         )
 
-    @property
-    def gacha_log_controls(self) -> list[ft.Container]:
+    def set_gacha_logs(
+        self,
+        *,
+        gacha_histories: Sequence[GachaLogEntry],
+        gacha_icons: dict[str | int, str],
+        params: GachaParams,
+        max_page: int,
+        stats: BannerStats | None = None,
+        page_total: int | None = None,
+        load_gacha_histories: LoadGachaHistories | None = None,
+    ) -> None:
+        """替换显示的抽卡记录，翻页和筛选时只更新表格和工具栏，不重建页面
+        :param gacha_histories: 首次渲染的抽卡记录
+        :param page_total: 当前页的物品总数，多于 gacha_histories 时其余随滚动分批加载
+        :param load_gacha_histories: 按 (页内偏移, 数量) 加载抽卡记录和对应的图标
+        """
+        self.gachas = [i.item for i in gacha_histories]
+        # 点击物品时按 id 取出，不需要遍历
+        self.gacha_entries = {i.item.id: i for i in gacha_histories}
+        self.gacha_icons = gacha_icons
+        self.params = params
+        self.max_page = max_page
+        self.stats = stats
+        self.chunk_size = max(len(self.gachas), 1)
+        self.page_total = len(self.gachas) if page_total is None else page_total
+        self.load_gacha_histories = load_gacha_histories
+
+        self.search_field.value = params.name_contains
+        self.previous_page_button.disabled = params.page == 1
+        self.page_field.value = str(params.page)
+        self.next_page_button.disabled = params.page == max_page
+        self.stats_text.value = stats.summary if stats else ""
+        self.stats_text.visible = stats is not None
+        self.grid.controls = self.build_gacha_log_controls(self.gachas)
+        self.load_more_button.visible = self.has_more
+
+    def build_gacha_log_controls(
+        self, gachas: Sequence[BaseGachaItem]
+    ) -> list[ft.Container]:
         rarity_colors: dict[int, str] = {3: "#3e4857", 4: "#4d3e66", 5: "#915537"}
         paddings: dict[Game, int] = {
             Game.GENSHIN: 0,
@@ -97,7 +161,7 @@ class GachaLogPage(ft.View):
         }
         result: list[ft.Container] = []
 
-        for gacha in self.gachas:
+        for gacha in gachas:
             key = gacha.key
             stack_controls = [
                 ft.Container(
@@ -117,13 +181,58 @@ class GachaLogPage(ft.View):
 
         return result
 
+    @property
+    def has_more(self) -> bool:
+        return self.load_gacha_histories is not None and len(self.gachas) < self.page_total
+
+    async def load_next_chunk(self) -> None:
+        """加载并追加下一批物品，只发送新增的控件"""
+        if not self.has_more or self._loading:
+            return
+        self._loading = True
+        try:
+            count = min(self.chunk_size, self.page_total - len(self.gachas))
+            load_gacha_histories = self.load_gacha_histories
+            entries, gacha_icons = await load_gacha_histories(len(self.gachas), count)
+            if load_gacha_histories is not self.load_gacha_histories:
+                # 加载期间已翻页
+                return
+            if len(entries) < count:
+                # 期间抽卡记录有更新，不再继续加载
+                self.page_total = len(self.gachas) + len(entries)
+            gachas = [i.item for i in entries]
+            self.gacha_icons.update(gacha_icons)
+            self.gachas.extend(gachas)
+            self.gacha_entries.update((i.item.id, i) for i in entries)
+            self.grid.controls.extend(self.build_gacha_log_controls(gachas))
+            self.load_more_button.visible = self.has_more
+            await self.update_async()
+        finally:
+            self._loading = False
+
+    async def refresh_async(self) -> None:
+        """原地更新后发送变化的控件，并回到顶部"""
+        await self.update_async()
+        await self.scroll_to_async(offset=0, duration=0)
+        await self.grid.scroll_to_async(offset=0, duration=0)
+
+    async def on_scroll(self, e: ft.OnScrollEvent) -> None:
+        # 距离底部不足一屏时加载下一批
+        if e.max_scroll_extent - e.pixels <= e.viewport_dimension:
+            await self.load_next_chunk()
+
+    async def load_more_on_click(self, _: ft.ControlEvent) -> None:
+        await self.load_next_chunk()
+
     async def container_on_click(self, e: ft.ControlEvent) -> None:
         page: ft.Page = e.page
-        gacha = next(g for g in self.gachas if g.id == e.control.data)
+        entry = self.gacha_entries[e.control.data]
 
         await page.show_dialog_async(
             GachaLogDialog(
-                gacha=gacha,
+                gacha=entry.item,
+                position=entry.position,
+                pity=entry.pity,
             )
         )
 
@@ -138,7 +247,8 @@ class GachaLogPage(ft.View):
 
     async def on_search_bar_submit(self, e: ft.ControlEvent) -> None:
         page: ft.Page = e.page
-        self.params.name_contains = e.control.value.lower()
+        # 大小写、全角和拼音首字母由服务端的名称搜索索引处理
+        self.params.name_contains = e.control.value.strip()
         self.params.page = 1
         await page.go_async(f"/gacha_log?{self.params.to_query_string()}")
 
@@ -168,6 +278,8 @@ class GachaLogDialog(ft.AlertDialog):
         self,
         *,
         gacha: BaseGachaItem,
+        position: int | None = None,
+        pity: int | None = None,
     ) -> None:
         gacha_time = gacha.time.astimezone(
             datetime.timezone(datetime.timedelta(hours=8))
@@ -175,6 +287,10 @@ class GachaLogDialog(ft.AlertDialog):
         time_string = gacha_time.strftime("%Y-%m-%d %H:%M:%S") + " UTC+8"
 
         text = f"ID: {gacha.id}\n名称: {gacha.name}\n抽取时间: {time_string}"
+        if position is not None:
+            text += f"\n卡池第 {position + 1} 抽"
+        if pity is not None:
+            text += f"\n距上一个 {gacha.rank_type} ★ 及以上: {pity} 抽"
         super().__init__(
             content=ft.Text(text),
             title=ft.Text("抽卡物品详情"),
@@ -21,8 +21,8 @@ class GachaParams(BaseParams, frozen=False):
     原神：角色祈愿、武器祈愿、常驻祈愿、新手祈愿、集录祈愿
     """
     rarities: list[int] = Field(default_factory=list)
-    size: int = 100
-    page: int = 1
+    size: int = Field(100, ge=1, le=500)
+    page: int = Field(1, ge=1)
     name_contains: str | None = None
 
     @field_validator("rarities", mode="before")